@@ -0,0 +1,165 @@
+# batch_render.py
+# Draws canvases from scripts, without opening a window, and saves them as PNG images. A script is either a JSON
+# file with a list of operations (see paint_tools.py), or a text file with one operation per line:
+#
+#   # comment
+#   pencil 255,0,0 10,10 20,20 30,40        stroke tools: colour, then the points of the stroke
+#   blur 100,100 120,110                    blur, pixelate, and smudge: the points of the stroke
+#   line 0,0,0 10,10 200,100                line, rectangle, and oval tools: colour, start, end
+#   polygon_filled 0,0,255 10,10 90,10 50,80
+#   ink 0,128,0 100,100 200,120
+#   bucket 255,255,0 400,300
+#   stamp earth 300,200                     stamp name and the centre of the stamp
+#   text 0,0,0 300,200 Hello\nworld         colour, centre of the text, then the text (\n starts a new line)
+#   selection 400,300 10,10 100,10 60,80    where to move the selection, then the points of the selection
+#   clear
+#
+# Coordinates are relative to the top left corner of the 750 x 550 canvas. Each image is named after its script
+# (x.txt -> x.png); scripts that would get the same name keep more of their path (x.txt.png, a_x.txt.png).
+#
+# python batch_render.py script1.txt script2.json ... [-o output_folder] [-j processes]
+#                         [--colours 16] [--palette] [--dither ordered|floyd]     8-bit images (see quantize.py)
+
+###########################################################################
+
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy') # no window is needed
+from pygame import *
+from paint_tools import *
+from quantize import save_indexed
+import sys
+import json
+import time # after pygame, which has its own time module
+import argparse
+import multiprocessing
+from collections import Counter
+
+###########################################################################
+
+stamps = None # stamp surfaces, loaded once in each process
+
+def parse_numbers(word): # '10,20' -> [10, 20]
+    return [int(i) for i in word.split(',')]
+
+def parse_line(line): # one line of a text script -> operation (None for blank lines and comments)
+    words = line.split()
+    if len(words) == 0 or words[0].startswith('#'):
+        return None
+    kind = words[0]
+    if kind in stroke_tools or kind in ['ink', 'polygon', 'polygon_filled']:
+        return {'op': kind, 'colour': parse_numbers(words[1]), 'points': [parse_numbers(i) for i in words[2:]]}
+    elif kind in point_tools + ['smudge']:
+        return {'op': kind, 'points': [parse_numbers(i) for i in words[1:]]}
+    elif kind in shape_tools:
+        return {'op': kind, 'colour': parse_numbers(words[1]), 'start': parse_numbers(words[2]), 'end': parse_numbers(words[3])}
+    elif kind == 'bucket':
+        return {'op': kind, 'colour': parse_numbers(words[1]), 'point': parse_numbers(words[2])}
+    elif kind == 'stamp':
+        if words[1] not in stamp_files:
+            raise ValueError('unknown stamp %r' % words[1])
+        return {'op': kind, 'name': words[1], 'point': parse_numbers(words[2])}
+    elif kind == 'text':
+        return {'op': kind, 'colour': parse_numbers(words[1]), 'point': parse_numbers(words[2]),
+                'text': line.split(None, 3)[3].replace('\\n', '\n') if len(words) > 3 else ''}
+    elif kind == 'selection':
+        return {'op': kind, 'point': parse_numbers(words[1]), 'points': [parse_numbers(i) for i in words[2:]]}
+    elif kind == 'clear':
+        return {'op': kind}
+    raise ValueError('unknown operation %r' % kind)
+
+def load_script(fileName): # list of operations in a JSON or text script
+    with open(fileName) as f:
+        source = f.read()
+    if source.lstrip().startswith('['):
+        return json.loads(source)
+    ops = []
+    for number, line in enumerate(source.splitlines(), 1):
+        try:
+            op = parse_line(line)
+        except (ValueError, IndexError) as error:
+            raise ValueError('line %i: %s' % (number, error))
+        if op != None:
+            ops.append(op)
+    return ops
+
+def render(ops): # canvas with every operation applied to it
+    global stamps
+    if stamps == None:
+        stamps = load_stamps()
+    canvas = Surface(canvasSize)
+    canvas.fill(WHITE)
+    for op in ops:
+        apply_op(op, canvas, stamps)
+    return canvas
+
+def render_file(job): # render one script and save it -- returns an error message, or None
+    fileName, outName, colours = job # colours is (number of colours, fixed palette, dithering), or None
+    try:
+        if colours == None:
+            image.save(render(load_script(fileName)), outName)
+        else:
+            save_indexed(render(load_script(fileName)), outName, *colours)
+    except Exception as error:
+        return '%s: %s' % (fileName, error)
+    return None
+
+def output_names(scripts): # file name of the image for each script
+    # i.e. the script's name without its extension -- but scripts that would get the same name (a/x.txt and
+    # b/x.json) keep their extension, and then their path from the folder that has every script in it
+    paths = [os.path.abspath(i) for i in scripts]
+    common = os.path.commonpath([os.path.dirname(i) for i in paths])
+    ways = [lambda path: os.path.splitext(os.path.basename(path))[0],
+            os.path.basename,
+            lambda path: os.path.relpath(path, common).replace(os.sep, '_')]
+    counts = [Counter(way(i).lower() for i in paths) for way in ways] # names on Windows and macOS ignore case
+    names = []
+    for path in paths:
+        for way, count in zip(ways, counts):
+            name = way(path) + '.png'
+            if count[way(path).lower()] == 1:
+                break
+        names.append(name)
+    same = [name for name, n in Counter(i.lower() for i in names).items() if n > 1]
+    if len(same) > 0:
+        raise ValueError('more than one script would be saved as %s' % ', '.join(same))
+    return names
+
+###########################################################################
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Render drawing scripts to PNG images without a window.')
+    parser.add_argument('scripts', nargs = '+', help = 'JSON or text scripts')
+    parser.add_argument('-o', '--output', default = '.', help = 'folder for the images (default: current folder)')
+    parser.add_argument('-j', '--processes', type = int, default = os.cpu_count(),
+                        help = 'number of processes (default: one per CPU)')
+    parser.add_argument('--colours', type = int, help = 'save 8-bit images with this many colours, up to 256')
+    parser.add_argument('--palette', action = 'store_true', help = 'with --colours, use colours from Images/palette.jpg')
+    parser.add_argument('--dither', choices = ['ordered', 'floyd'], help = 'with --colours, dither the images')
+    args = parser.parse_args()
+    colours = (min(max(args.colours, 1), 256), args.palette, args.dither) if args.colours else None
+
+    try:
+        names = output_names(args.scripts)
+    except ValueError as error:
+        parser.error(str(error))
+    os.makedirs(args.output, exist_ok = True)
+    jobs = [(i, os.path.join(args.output, name), colours) for i, name in zip(args.scripts, names)]
+    processes = max(min(args.processes, len(jobs)), 1)
+    start = time.time()
+    if processes == 1:
+        errors = [render_file(job) for job in jobs]
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            errors = list(pool.imap_unordered(render_file, jobs))
+    elapsed = time.time() - start
+
+    errors = [i for i in errors if i != None]
+    for error in errors:
+        print(error, file = sys.stderr)
+    done = len(jobs) - len(errors)
+    print('rendered %i canvases in %.2f s (%.1f canvases per second, %i processes)' %
+          (done, elapsed, done/max(elapsed, 1e-9), processes))
+    return 1 if len(errors) > 0 else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,561 @@
+# collab.py
+# Shared-canvas collaboration for paint_project.py. A server keeps the shared canvas and puts the operations
+# (see paint_tools.py) it receives from every user in one order, then sends them to everyone. Every user applies
+# the operations in that order with the same functions, so everyone ends up with the same canvas. A user who
+# joins late gets a compressed copy of the canvas, split into tiles. Stroke operations (one per frame while the
+# mouse is pressed) are joined together by the server before they are sent, so fewer messages are needed.
+# Undo, load, and moving a shape can't be described as a tool operation, so they are sent as a patch: tiles of
+# only the pixels that the edit changed, with every other pixel see-through. Undo only puts back the pixels that
+# still look the way this user's edit left them, so it never takes back what the other users drew.
+#
+# python collab.py serve [--port 5050]                 start a server on this computer
+# python paint_project.py --join localhost:5050        open the paint program and join the server
+# python collab.py bench [--clients 4] [--seconds 3]   measure bandwidth and latency with simulated users
+
+###########################################################################
+
+from pygame import *
+from random import *
+from paint_tools import *
+from text_engine import font_families, text_sizes, defaultFamily, defaultSize, maxText
+import json
+import zlib
+import base64
+import socket
+import selectors
+import threading
+import queue
+import time # after pygame, which has its own time module
+import argparse
+
+###########################################################################
+
+port = 5050 # default port for the server
+tileSize = 50 # width and height of each tile of a canvas copy
+tickTime = 1/30 # seconds between two broadcasts from the server
+maxCoordinate = 10000 # points further than this from the canvas are refused
+maxPoints = 10000 # points in one operation
+maxLine = 1 << 24 # bytes in one message from a user
+
+def encode(message): # one line of compact JSON for a message
+    return (json.dumps(message, separators = (',', ':')) + '\n').encode()
+
+def encode_tiles(canvas, old = None): # list of compressed tiles of the canvas
+    # i.e. only tiles that are different from the same tile on old (or on a blank canvas) are included
+    tiles = []
+    w, h = canvas.get_size()
+    for y in range(0, h, tileSize):
+        for x in range(0, w, tileSize):
+            tileRect = Rect(x, y, tileSize, tileSize).clip(canvas.get_rect())
+            data = image.tostring(canvas.subsurface(tileRect), 'RGB')
+            if old == None:
+                same = data == b'\xff'*len(data) # all white
+            else:
+                same = data == image.tostring(old.subsurface(tileRect), 'RGB')
+            if not same:
+                tiles.append([x, y, tileRect.w, tileRect.h, base64.b64encode(zlib.compress(data)).decode()])
+    return tiles
+
+def changed_tiles(canvas, old): # list of Rects of the tiles of canvas that (might) be different on old
+    # i.e. compares the pixels as they are stored, which is much faster than image.tostring
+    if canvas.get_pitch() != canvas.get_width()*canvas.get_bytesize():
+        canvas = canvas.copy() # its rows are next to each other, unlike a subsurface of the screen
+    if old.get_pitch() != canvas.get_pitch():
+        old = old.convert(canvas)
+    w, h = canvas.get_size()
+    size = canvas.get_bytesize()
+    data, oldData = canvas.get_buffer().raw, old.get_buffer().raw
+    tiles = []
+    for y in range(0, h, tileSize):
+        rows = range(y*w*size, min(y+tileSize, h)*w*size, w*size) # where each row of this band of tiles starts
+        if data[rows[0]:rows[-1]+w*size] == oldData[rows[0]:rows[-1]+w*size]:
+            continue # nothing changed in the band
+        for x in range(0, w, tileSize):
+            left, right = x*size, min(x+tileSize, w)*size
+            if any(data[i+left:i+right] != oldData[i+left:i+right] for i in rows):
+                tiles.append(Rect(x, y, tileSize, tileSize).clip(canvas.get_rect()))
+    return tiles
+
+def encode_patch(canvas, old, tiles = None): # list of compressed tiles of only the pixels of canvas that are different on old
+    # i.e. the pixels that are the same are see-through, so drawing the patch on a canvas changes nothing else
+    patches = []
+    for tileRect in changed_tiles(canvas, old) if tiles == None else tiles:
+        tile, oldTile = canvas.subsurface(tileRect), old.subsurface(tileRect)
+        same = mask.from_threshold(tile, (0, 0, 0), (1, 1, 1, 255), oldTile) # pixels with the same colour
+        if same.count() == tileRect.w*tileRect.h:
+            continue
+        patch = Surface(tileRect.size, SRCALPHA)
+        patch.blit(tile, (0, 0))
+        same.to_surface(patch, setcolor = (0, 0, 0, 0), unsetcolor = None)
+        data = image.tostring(patch, 'RGBA')
+        patches.append([tileRect.x, tileRect.y, tileRect.w, tileRect.h, base64.b64encode(zlib.compress(data)).decode()])
+    return patches
+
+def decode_tiles(tiles, canvas, format = 'RGB'): # draw compressed tiles (or a patch, with 'RGBA') onto the canvas
+    for x, y, w, h, data in tiles:
+        canvas.blit(image.fromstring(zlib.decompress(base64.b64decode(data)), (w, h), format), (x, y))
+
+def undo_patch(before, after, canvas): # patch that takes back an edit (see encode_patch) on the canvas as it is now
+    # i.e. before has the pixels the edit changed as they were before it, after has them as the edit left them --
+    # pixels that are different from after now were changed again by someone else, so they are left out
+    tiles = []
+    for (x, y, w, h, data), (x2, y2, w2, h2, afterData) in zip(before, after):
+        patch = image.fromstring(zlib.decompress(base64.b64decode(data)), (w, h), 'RGBA')
+        afterTile = image.fromstring(zlib.decompress(base64.b64decode(afterData)), (w, h), 'RGBA')
+        changed = mask.from_threshold(afterTile, (0, 0, 0), (1, 1, 1, 255), canvas.subsurface(x, y, w, h))
+        changed.invert()
+        changed.to_surface(patch, setcolor = (0, 0, 0, 0), unsetcolor = None)
+        if changed.count() < w*h:
+            tiles.append([x, y, w, h, base64.b64encode(zlib.compress(image.tostring(patch, 'RGBA'))).decode()])
+    return tiles
+
+def apply_message(op, canvas, stamps): # apply an operation from the server to a canvas
+    if op['op'] == 'patch': # used for undo, load, and moving a shape, which can't be described as a tool operation
+        decode_tiles(op['tiles'], canvas, 'RGBA')
+    else:
+        apply_op(op, canvas, stamps)
+
+def check_point(point): # raise ValueError unless point is [x, y] with whole numbers near the canvas
+    if type(point) != list or len(point) != 2 or any(type(i) != int or abs(i) > maxCoordinate for i in point):
+        raise ValueError('bad point %r' % (point,))
+
+def check_points(points, least = 1, most = maxPoints):
+    if type(points) != list or not least <= len(points) <= most:
+        raise ValueError('bad list of points')
+    for point in points:
+        check_point(point)
+
+def check_tiles(tiles): # tiles must be inside the canvas
+    if type(tiles) != list:
+        raise ValueError('bad list of tiles')
+    for tile in tiles:
+        if type(tile) != list or len(tile) != 5 or any(type(i) != int for i in tile[:4]) or type(tile[4]) != str:
+            raise ValueError('bad tile')
+        x, y, w, h = tile[:4]
+        if w <= 0 or h <= 0 or not Rect(0, 0, *canvasSize).contains(Rect(x, y, w, h)):
+            raise ValueError('tile outside the canvas')
+
+def check_op(op): # raise ValueError unless op is an operation a user can send to the server
+    # i.e. a user can't stop the server, or the other users, by sending something apply_op can't draw
+    if type(op) != dict or type(op.get('id')) != int:
+        raise ValueError('operation without an id')
+    kind = op.get('op')
+    if 'colour' in op or kind in stroke_tools + shape_tools + ['ink', 'polygon', 'polygon_filled', 'bucket', 'text']:
+        colour = op.get('colour')
+        if type(colour) != list or len(colour) != 3 or any(type(i) != int or not 0 <= i <= 255 for i in colour):
+            raise ValueError('bad colour %r' % (colour,))
+    if kind in stroke_tools + point_tools + ['smudge', 'ink']:
+        # blur and pixelate are slow, so each operation is one point (the paint program sends one each frame)
+        check_points(op.get('points'), 1, 1 if kind in point_tools else maxPoints)
+        if type(op.get('stroke', 0)) != int or type(op.get('seed', 0)) != int:
+            raise ValueError('bad stroke')
+    elif kind in shape_tools:
+        check_point(op.get('start'))
+        check_point(op.get('end'))
+    elif kind in ['polygon', 'polygon_filled']:
+        check_points(op.get('points')) # a double click closes a polygon with one point
+    elif kind == 'bucket':
+        check_point(op.get('point'))
+    elif kind == 'text':
+        check_point(op.get('point'))
+        if type(op.get('text')) != str or len(op['text']) > maxText:
+            raise ValueError('bad text')
+        if op.get('font', defaultFamily) not in [i[0] for i in font_families] or op.get('size', defaultSize) not in text_sizes:
+            raise ValueError('bad font')
+    elif kind == 'selection':
+        check_points(op.get('points'), 3)
+        check_point(op.get('point'))
+        xs, ys = zip(*op['points'])
+        smallest, largest = scale_limits((max(xs)-min(xs)+1, max(ys)-min(ys)+1)) # the same limits as the handles
+        angle, scale = op.get('angle', 0), op.get('scale', 1)
+        if type(angle) not in [int, float] or abs(angle) > 360 or type(scale) not in [int, float]:
+            raise ValueError('bad angle or scale')
+        if not smallest <= scale <= largest and scale != 1:
+            raise ValueError('bad scale %r' % (scale,))
+    elif kind == 'stamp':
+        check_point(op.get('point'))
+        if op.get('name') not in stamp_files:
+            raise ValueError('unknown stamp %r' % (op.get('name'),))
+    elif kind == 'patch':
+        check_tiles(op.get('tiles'))
+    elif kind != 'clear':
+        raise ValueError('unknown operation %r' % (kind,))
+
+def can_join(old, new): # whether operation new can be added to the end of operation old (same stroke)
+    if old['op'] != new['op'] or old.get('stroke') != new.get('stroke') or old.get('colour') != new.get('colour'):
+        return False
+    if new['op'] in point_tools:
+        return True
+    return old['points'][-1] == new['points'][0] # the new part of the stroke starts where the old part ended
+
+###########################################################################
+
+class CollabServer: # shared canvas, and the order of every operation on it
+    def __init__(self, host = 'localhost', port = port):
+        self.listener = socket.create_server((host, port))
+        self.listener.setblocking(False)
+        self.port = self.listener.getsockname()[1] # port 0 means any free port
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.listener, selectors.EVENT_READ)
+        self.clients = {} # socket: information about the user on that socket
+        self.canvas = Surface(canvasSize)
+        self.canvas.fill(WHITE)
+        self.stamps = load_stamps()
+        self.pending = [] # operations received since the last broadcast
+        self.seq = 0 # number of operations put in order and sent
+        self.nextClient = 1
+        self.running = False
+        self.opsIn, self.opsOut = 0, 0 # for bench
+        # operations are sent as soon as they are in order, and the canvas (only needed for users who join later)
+        # is drawn on by a worker thread, so a slow operation (like filling the whole canvas) never holds up the
+        # server -- every user applies the same operations in the same order anyway
+        self.applied = 0 # number of operations the worker applied to the canvas
+        self.unapplied = [] # (seq, data) for each operation that was sent, but isn't on the canvas yet
+        self.jobs = queue.Queue() # for the worker: ('ops', operations) or ('welcome', id of the new user)
+        self.results = queue.Queue() # from the worker: ('applied', seq, ids of bad users) or ('welcome', id, seq, data)
+        self.wakeup, self.wakeupSignal = socket.socketpair() # the worker wakes the server up when it has results
+        self.wakeup.setblocking(False)
+        self.wakeupSignal.setblocking(False)
+        self.selector.register(self.wakeup, selectors.EVENT_READ)
+        self.worker = threading.Thread(target = self.work, daemon = True)
+
+    def serve_forever(self):
+        self.running = True
+        self.worker.start()
+        nextTick = time.time() + tickTime
+        while self.running:
+            for key, mask in self.selector.select(max(nextTick-time.time(), 0)):
+                if key.fileobj == self.listener:
+                    self.accept()
+                elif key.fileobj == self.wakeup:
+                    self.finish()
+                elif mask & selectors.EVENT_READ:
+                    self.read(key.fileobj)
+                if mask & selectors.EVENT_WRITE and key.fileobj in self.clients:
+                    self.write(key.fileobj)
+            if time.time() >= nextTick:
+                self.broadcast()
+                nextTick = max(nextTick + tickTime, time.time())
+        self.jobs.put(None)
+        self.worker.join()
+        for sock in list(self.clients):
+            self.drop(sock)
+        self.selector.close()
+        self.listener.close()
+        self.wakeup.close()
+        self.wakeupSignal.close()
+
+    def stop(self):
+        self.running = False
+
+    def accept(self): # new user -- the worker makes their copy of the canvas (see finish)
+        sock, address = self.listener.accept()
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.clients[sock] = {'id': self.nextClient, 'buffer': b'', 'out': bytearray(), 'stroke': None, 'welcomed': False}
+        self.selector.register(sock, selectors.EVENT_READ)
+        self.jobs.put(('welcome', self.nextClient))
+        self.nextClient += 1
+
+    def drop(self, sock):
+        self.selector.unregister(sock)
+        sock.close()
+        del self.clients[sock]
+
+    def read(self, sock):
+        try:
+            data = sock.recv(65536)
+        except BlockingIOError:
+            return
+        except ConnectionError:
+            data = b''
+        if data == b'':
+            self.drop(sock)
+            return
+        client = self.clients[sock]
+        lines = (client['buffer'] + data).split(b'\n')
+        client['buffer'] = lines.pop() # incomplete line
+        if len(client['buffer']) > maxLine:
+            lines.append(b'') # too long to be an operation
+        for line in lines:
+            try:
+                op = json.loads(line)
+                check_op(op)
+            except (ValueError, RecursionError): # ValueError is also raised for lines that aren't JSON
+                print('dropped user %i: bad operation' % client['id'])
+                self.drop(sock)
+                return
+            self.receive(client, op)
+
+    def receive(self, client, op): # add an operation to the next broadcast
+        # i.e. the next part of a stroke is joined to the part that is already waiting, if there is one
+        self.opsIn += 1
+        op['client'] = client['id']
+        last = client['stroke']
+        if op['op'] in stroke_tools + point_tools:
+            if last != None and can_join(last, op):
+                last['points'] += op['points'] if op['op'] in point_tools else op['points'][1:]
+                last['id'] = op['id'] # the user has now been answered up to this operation
+                return
+            client['stroke'] = op
+        else:
+            client['stroke'] = None
+        self.pending.append(op)
+
+    def broadcast(self): # put the waiting operations in order, send them to everyone, and hand them to the worker
+        data = bytearray()
+        for op in self.pending:
+            self.seq += 1
+            op['seq'] = self.seq
+            line = encode(op)
+            self.unapplied.append((self.seq, line))
+            data += line
+            self.opsOut += 1
+        if len(self.pending) > 0:
+            self.jobs.put(('ops', self.pending))
+        self.pending = []
+        for client in self.clients.values():
+            client['stroke'] = None
+        if len(data) > 0:
+            for sock in [sock for sock in self.clients if self.clients[sock]['welcomed']]:
+                self.clients[sock]['out'] += data
+                self.write(sock)
+
+    def work(self): # apply operations to the canvas, and copy it for new users (runs on its own thread)
+        # i.e. an operation that can't be applied fails the same way for every user, so the canvases still agree,
+        # but the user who sent it is dropped
+        while True:
+            job = self.jobs.get()
+            if job == None:
+                break
+            if job[0] == 'welcome':
+                welcome = {'op': 'welcome', 'client': job[1], 'seq': self.applied, 'tiles': encode_tiles(self.canvas)}
+                self.results.put(('welcome', job[1], self.applied, encode(welcome)))
+            else:
+                bad = set() # ids of users who sent an operation that couldn't be applied
+                for op in job[1]:
+                    try:
+                        apply_message(op, self.canvas, self.stamps)
+                    except Exception as error:
+                        print('dropped user %i: %r' % (op['client'], error))
+                        bad.add(op['client'])
+                    self.applied = op['seq']
+                self.results.put(('applied', self.applied, bad))
+            try:
+                self.wakeupSignal.send(b'!')
+            except BlockingIOError: # the server already has a wake up waiting
+                pass
+
+    def finish(self): # deal with what the worker has finished, in the order it finished it
+        # i.e. a new user gets their copy of the canvas, then every operation that was sent after it was copied
+        try:
+            self.wakeup.recv(4096)
+        except BlockingIOError:
+            pass
+        while not self.results.empty():
+            result = self.results.get()
+            if result[0] == 'applied':
+                kind, seq, bad = result
+                done = 0
+                while done < len(self.unapplied) and self.unapplied[done][0] <= seq:
+                    done += 1
+                del self.unapplied[:done]
+                for sock in [sock for sock in self.clients if self.clients[sock]['id'] in bad]:
+                    self.drop(sock)
+                continue
+            kind, id, seq, data = result
+            for sock in [sock for sock in self.clients if self.clients[sock]['id'] == id]:
+                client = self.clients[sock]
+                client['welcomed'] = True
+                client['out'] += data
+                for i, line in self.unapplied:
+                    if i > seq:
+                        client['out'] += line
+                self.write(sock)
+
+    def write(self, sock): # send as much as possible without waiting
+        client = self.clients[sock]
+        try:
+            sent = sock.send(client['out'])
+        except BlockingIOError:
+            sent = 0
+        except ConnectionError:
+            self.drop(sock)
+            return
+        del client['out'][:sent]
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if len(client['out']) > 0 else 0)
+        self.selector.modify(sock, events)
+
+###########################################################################
+
+class CollabClient: # connection to a server, and the canvas that everyone agrees on
+    def __init__(self, host = 'localhost', port = port):
+        self.sock = socket.create_connection((host, port))
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.canvas = Surface(canvasSize) # canvas after every operation from the server so far
+        self.canvas.fill(WHITE)
+        self.stamps = load_stamps()
+        self.incoming = queue.Queue() # messages from the server that haven't been applied yet
+        self.id = None # given by the server
+        self.seq = 0 # number of operations applied to the canvas
+        self.changed = False # whether the canvas changed since the paint program last showed it
+        self.sent, self.acked = 0, 0 # ids of the last operation sent, and of the last one the server sent back
+        self.sendTimes = {} # id: time it was sent (for latency)
+        self.latencies = []
+        self.bytesSent, self.bytesReceived = 0, 0
+        self.connected = True
+        threading.Thread(target = self.read, daemon = True).start()
+
+    def read(self): # runs on its own thread, so the paint program never waits for the network
+        buffer = b''
+        while True:
+            try:
+                data = self.sock.recv(65536)
+            except OSError:
+                data = b''
+            if data == b'':
+                self.incoming.put(None)
+                return
+            self.bytesReceived += len(data)
+            lines = (buffer + data).split(b'\n')
+            buffer = lines.pop()
+            for line in lines:
+                self.incoming.put(json.loads(line))
+
+    def send(self, op):
+        if self.connected:
+            self.sent += 1
+            op['id'] = self.sent
+            data = encode(op)
+            self.sendTimes[self.sent] = time.time()
+            try:
+                self.sock.sendall(data)
+                self.bytesSent += len(data)
+            except OSError:
+                self.connected = False
+
+    def poll(self): # apply every message that has arrived (only call this from the thread that draws)
+        while not self.incoming.empty():
+            op = self.incoming.get()
+            if op == None:
+                self.connected = False
+            elif op['op'] == 'welcome':
+                self.id = op['client']
+                self.seq = op['seq']
+                self.canvas.fill(WHITE)
+                decode_tiles(op['tiles'], self.canvas)
+                self.changed = True
+            else:
+                self.seq = op['seq']
+                try:
+                    apply_message(op, self.canvas, self.stamps)
+                except Exception: # it fails the same way for every user (see CollabServer.work)
+                    pass
+                self.changed = True
+                if op['client'] == self.id:
+                    now = time.time()
+                    for i in range(self.acked+1, op['id']+1):
+                        self.latencies.append(now - self.sendTimes.pop(i))
+                    self.acked = op['id']
+
+    def waiting(self): # whether some of this user's operations haven't come back from the server yet
+        return self.connected and self.acked < self.sent
+
+    def close(self):
+        self.connected = False
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+###########################################################################
+
+def simulate(client, seconds, rate): # simulated user -- random strokes at the given number of frames per second
+    x, y = randint(0, 749), randint(0, 549)
+    colour = [randint(0, 255), randint(0, 255), randint(0, 255)]
+    tool = choice(stroke_tools)
+    stroke = 0
+    end = time.time() + seconds
+    while time.time() < end:
+        if random() < 0.02: # new stroke
+            stroke += 1
+            tool = choice(stroke_tools)
+            if random() < 0.3:
+                client.send({'op': 'stamp', 'name': choice(list(stamp_files)), 'point': [x, y]})
+            elif random() < 0.3:
+                client.send({'op': 'rectangle', 'colour': colour, 'start': [x, y], 'end': [x+40, y+30]})
+        oldx, oldy = x, y
+        x = min(max(x+randint(-6, 6), 0), 749)
+        y = min(max(y+randint(-6, 6), 0), 549)
+        client.send({'op': tool, 'colour': colour, 'points': [[oldx, oldy], [x, y]], 'stroke': stroke,
+                     'seed': randint(0, 9999)})
+        client.poll()
+        time.sleep(1/rate)
+    while client.waiting():
+        client.poll()
+        time.sleep(0.001)
+
+def bench(clients = 4, seconds = 3, rate = 120): # measure bandwidth and latency with simulated users
+    init()
+    server = CollabServer(port = 0)
+    serverThread = threading.Thread(target = server.serve_forever, daemon = True)
+    serverThread.start()
+    users = [CollabClient('localhost', server.port) for i in range(clients)]
+    threads = [threading.Thread(target = simulate, args = (user, seconds, rate)) for user in users]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.time() - start
+    while any(user.seq < server.seq for user in users): # let the last broadcast arrive everywhere
+        for user in users:
+            user.poll()
+        time.sleep(0.001)
+
+    late = CollabClient('localhost', server.port) # late joiner
+    while late.id == None:
+        late.poll()
+        time.sleep(0.001)
+    snapshot = late.bytesReceived
+    server.stop()
+    serverThread.join()
+
+    expected = image.tostring(server.canvas, 'RGB')
+    latencies = sorted(i for user in users for i in user.latencies)
+    print('clients: %i, %.1f s, %i frames per second each' % (clients, elapsed, rate))
+    print('operations sent: %i, broadcast after joining strokes: %i (%.1fx fewer)' %
+          (server.opsIn, server.opsOut, server.opsIn/max(server.opsOut, 1)))
+    print('upload per client: %.1f KB/s' % (sum(user.bytesSent for user in users)/clients/elapsed/1024))
+    print('download per client: %.1f KB/s' % (sum(user.bytesReceived for user in users)/clients/elapsed/1024))
+    print('latency: mean %.1f ms, 95th percentile %.1f ms, max %.1f ms' %
+          (1000*sum(latencies)/len(latencies), 1000*latencies[len(latencies)*95//100], 1000*latencies[-1]))
+    print('every canvas the same as the server: %s' %
+          all(image.tostring(user.canvas, 'RGB') == expected for user in users))
+    print('late joiner: %.1f KB snapshot, same as the server: %s' %
+          (snapshot/1024, image.tostring(late.canvas, 'RGB') == expected))
+    for user in users + [late]:
+        user.close()
+
+###########################################################################
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Shared-canvas collaboration server for the paint program.')
+    parser.add_argument('command', choices = ['serve', 'bench'])
+    parser.add_argument('--host', default = 'localhost')
+    parser.add_argument('--port', type = int, default = port)
+    parser.add_argument('--clients', type = int, default = 4, help = 'simulated users (bench)')
+    parser.add_argument('--seconds', type = float, default = 3, help = 'length of the bench')
+    parser.add_argument('--rate', type = int, default = 120, help = 'frames per second of each simulated user (bench)')
+    args = parser.parse_args()
+    if args.command == 'serve':
+        init()
+        server = CollabServer(args.host, args.port)
+        print('serving on %s:%i' % (args.host, server.port))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    else:
+        bench(args.clients, args.seconds, args.rate)
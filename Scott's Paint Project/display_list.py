@@ -0,0 +1,485 @@
+# display_list.py
+# Vector mode for paint_project.py. Instead of only being drawn into the canvas, finished strokes, shapes, text,
+# and stamps are kept in a display list as operations (see paint_tools.py), so they can be selected and moved
+# later. The canvas is split into square cells. Each cell remembers which shapes overlap it, so finding the shape
+# under the mouse only checks the shapes in one cell, and moving a shape only redraws the cells it was in and the
+# cells it moved to. The drawn canvas is kept on a surface, so nothing is redrawn until a shape changes. Each
+# shape is drawn once onto its own surface (a sprite), so redrawing a cell only blits the sprites over it. Only
+# the squares of a sprite that something is drawn on are kept, and a shape is only in the cells those squares
+# overlap, so a long stroke doesn't cost the memory (or the redrawing) of the whole Rect around it. Sprites that
+# haven't been drawn for a while are thrown away when they take up too much memory, and made again if needed.
+
+###########################################################################
+
+from pygame import *
+from random import *
+from math import *
+from paint_tools import *
+from text_engine import text_size, defaultFamily, defaultSize
+import time # after pygame, which has its own time module
+import argparse
+try:
+    import numpy # for marker sprites (pygame.surfarray needs it too)
+except ImportError:
+    numpy = None
+
+###########################################################################
+
+cellSize = 50 # width and height of each cell of the canvas (and of the squares big sprites are split into)
+spriteMemory = 64*1024*1024 # bytes of sprites that are kept
+hitMargin = 3 # how far hit_op can find a shape outside the pixels it draws
+
+# operations that can be kept as shapes -- the others (bucket fill, blur, ...) depend on the pixels under them
+vector_ops = stroke_tools + shape_tools + ['ink', 'polygon', 'polygon_filled', 'text', 'stamp']
+
+# how far each kind of shape reaches past its points (half the thickness of the line, plus a little extra)
+margins = {'pencil': 3, 'eraser': 21, 'brush': 21, 'spray': 21, 'glitter': 21, 'marker': 22, 'ink': 21,
+           'line': 3, 'rectangle': 1, 'rectangle_filled': 1, 'oval': 1, 'oval_filled': 1, 'polygon': 3,
+           'polygon_filled': 3}
+
+def op_points(op): # every point of an operation, as tuples
+    points = [tuple(i) for i in op.get('points', [])]
+    for key in ['start', 'end', 'point']:
+        if key in op:
+            points.append(tuple(op[key]))
+    return points
+
+def op_rect(op): # Rect around everything an operation draws
+    kind = op['op']
+    if kind in ['stamp', 'text']:
+        if kind == 'stamp':
+            w, h = stamp_files[op['name']][1]
+        else:
+            w, h = text_size(op['text'], op.get('font', defaultFamily), op.get('size', defaultSize))
+        mx, my = op['point']
+        return Rect(mx-w//2, my-h//2, w, h)
+    xs, ys = zip(*op_points(op))
+    margin = margins[kind]
+    return Rect(min(xs)-margin, min(ys)-margin, max(xs)-min(xs)+2*margin+1, max(ys)-min(ys)+2*margin+1)
+
+def move_op(op, dx, dy): # move an operation by (dx, dy)
+    if 'points' in op:
+        op['points'] = [[x+dx, y+dy] for (x, y) in op['points']]
+    for key in ['start', 'end', 'point']:
+        if key in op:
+            op[key] = [op[key][0]+dx, op[key][1]+dy]
+
+def segment_dist(x, y, x1, y1, x2, y2): # distance from (x, y) to the segment from (x1, y1) to (x2, y2)
+    dx, dy = x2-x1, y2-y1
+    if dx == 0 and dy == 0:
+        return hypot(x-x1, y-y1)
+    t = min(max(((x-x1)*dx + (y-y1)*dy) / (dx*dx + dy*dy), 0), 1) # closest point on the segment
+    return hypot(x-x1-t*dx, y-y1-t*dy)
+
+def inside_polygon(x, y, points): # whether (x, y) is inside the polygon
+    # i.e. counts how many edges a ray going right from the point crosses
+    inside = False
+    for i in range(len(points)):
+        x1, y1 = points[i-1]
+        x2, y2 = points[i]
+        if (y1 > y) != (y2 > y) and x < x1 + (y-y1)*(x2-x1)/(y2-y1):
+            inside = not inside
+    return inside
+
+def hit_op(op, x, y): # whether (x, y) is on the shape drawn by an operation
+    kind = op['op']
+    if kind in ['stamp', 'text', 'rectangle_filled']:
+        return op_rect(op).collidepoint(x, y)
+    if kind in ['rectangle', 'oval', 'oval_filled']:
+        (x1, y1), (x2, y2) = op['start'], op['end']
+        left, top = min(x1, x2), min(y1, y2)
+        w, h = max(abs(x2-x1), 1), max(abs(y2-y1), 1)
+        if kind == 'rectangle':
+            return Rect(left-2, top-2, w+4, h+4).collidepoint(x, y) and not Rect(left+5, top+5, w-10, h-10).collidepoint(x, y)
+        cx, cy = left + w/2, top + h/2
+        outer = ((x-cx)/(w/2+2))**2 + ((y-cy)/(h/2+2))**2 <= 1
+        if kind == 'oval_filled' or w < 16 or h < 16:
+            return outer
+        return outer and ((x-cx)/(w/2-5))**2 + ((y-cy)/(h/2-5))**2 >= 1
+    points = op_points(op)
+    if kind in ['polygon', 'polygon_filled']:
+        if kind == 'polygon_filled' and len(points) > 2 and inside_polygon(x, y, points):
+            return True
+        points = points + points[:1] # closed
+    width = margins[kind]
+    if len(points) == 1:
+        return hypot(x-points[0][0], y-points[0][1]) <= width
+    for i in range(len(points)-1):
+        if segment_dist(x, y, *points[i], *points[i+1]) <= width:
+            return True
+    return False
+
+def make_sprite(op, rect, stamps, canvas): # surface the size of the shape's Rect, with the shape drawn on it
+    # i.e. blitting the sprite at rect.topleft changes the canvas exactly the way apply_op does
+    kind = op['op']
+    if kind == 'stamp': # the same pixel format as the canvas, with alpha, is much faster to blit
+        return stamps[op['name']].convert(Surface((1, 1), SRCALPHA))
+    if kind == 'marker':
+        return marker_sprite(op, rect, canvas)
+    colour = tuple(op.get('colour', WHITE))
+    local = dict(op) # the same shape, with the sprite's top left corner at (0, 0)
+    move_op(local, -rect.x, -rect.y)
+    if kind == 'text': # see-through pixels have the colour of the text, so the edges of the letters blend the same
+        sprite = Surface(rect.size, SRCALPHA)
+        sprite.fill(colour + (0,))
+    else: # every other shape is drawn in one colour, so the sprite only needs a byte for each pixel
+        key = (0, 1, 1) if colour != (0, 1, 1) else (1, 1, 1) # for pixels the shape doesn't draw
+        sprite = Surface(rect.size, 0, 8)
+        sprite.set_palette([key] + [WHITE if kind == 'eraser' else colour]*255)
+        sprite.fill(key)
+        sprite.set_colorkey(key)
+    if kind == 'ink': # drawn solid, then blended all at once, like the ink_cover in apply_op
+        local['op'] = 'brush' # the same circles
+        sprite.set_alpha(100)
+    apply_op(local, sprite, stamps)
+    return sprite
+
+def marker_sprite(op, rect, canvas): # how many times the marker covers each pixel, and the colours that gives
+    # i.e. the marker blends a see-through circle over the canvas at every point, so a pixel's colour afterwards
+    # only depends on its colour before and how many circles covered it. This can't be one blit with per-pixel
+    # alpha, since each blend is rounded (and stops changing the pixel once it is close to the marker's colour),
+    # so every colour after 0 to 255 blends is found once with the same blit, and looked up when it is drawn.
+    colour = tuple(op['colour'])
+    dab = Surface((42, 42))
+    dab.fill((0, 0, 0))
+    if colour != (0, 1, 1): # the marker's colorkey -- apply_op doesn't draw anything then
+        draw.circle(dab, (1, 1, 1), (21, 21), 20)
+    covers = Surface(rect.size)
+    covers.fill((0, 0, 0))
+    for x, y in stroke_dabs([tuple(i) for i in op['points']]):
+        covers.blit(dab, (x-rect.x-21, y-rect.y-21), special_flags = BLEND_ADD) # stops at 255 (no more change)
+    counts = surfarray.array_red(covers)
+    blends = Surface((256, 1), 0, canvas) # every value of each channel, blended again and again
+    for i in range(256):
+        blends.set_at((i, 0), (i, i, i))
+    cover = Surface((256, 1)) # like marker_cover, so the blit blends the same way
+    cover.set_alpha(5)
+    cover.set_colorkey((0, 1, 1, 0))
+    cover.fill(colour)
+    table = numpy.empty((3, int(counts.max())+1, 256), numpy.uint8) # channel, blends, value before: value after
+    for n in range(table.shape[1]):
+        table[:, n] = surfarray.array3d(blends)[:, 0].T
+        blends.blit(cover, (0, 0))
+    # so a channel's value after count blends is at count*256 + its value before, in its row of the table
+    return counts, table.reshape(3, -1)
+
+def cell_rects(cells): # as few Rects as possible that cover a set of cells, and nothing else
+    # i.e. cells next to each other in a row are joined, and so are rows of them that line up
+    rows = []
+    for column, row in sorted(cells, key = lambda cell: (cell[1], cell[0])):
+        if len(rows) > 0 and rows[-1].top == row*cellSize and rows[-1].right == column*cellSize:
+            rows[-1].w += cellSize
+        else:
+            rows.append(Rect(column*cellSize, row*cellSize, cellSize, cellSize))
+    rects = []
+    for rect in rows:
+        above = [i for i in rects if i.bottom == rect.top and (i.left, i.w) == (rect.left, rect.w)]
+        if len(above) > 0:
+            above[0].h += cellSize
+        else:
+            rects.append(rect)
+    return rects
+
+def square_size(size): # width and height of the squares a sprite of this size is split into
+    # i.e. a small sprite is kept whole, since one blit is faster than a few
+    if size[0]*size[1] <= 4*cellSize*cellSize:
+        return max(size)
+    return cellSize
+
+def square_rect(column, row, size): # Rect of a square of a sprite of this size, on the sprite
+    step = square_size(size)
+    return Rect(column*step, row*step, step, step).clip(Rect((0, 0), size))
+
+def split_sprite(sprite, size): # {(column, row): square} for the squares of a sprite that draw something
+    # i.e. sprite is a surface, or a marker's counts (see marker_sprite)
+    squares = {}
+    step = square_size(size)
+    for column in range((size[0]-1)//step+1):
+        for row in range((size[1]-1)//step+1):
+            part = square_rect(column, row, size)
+            if isinstance(sprite, Surface):
+                square = sprite.subsurface(part)
+                if mask.from_surface(square, 0).count() > 0: # colorkey, or alpha above 0
+                    squares[column, row] = square.copy()
+            else:
+                square = sprite[part.left:part.right, part.top:part.bottom]
+                if square.any():
+                    squares[column, row] = square.copy()
+    return squares
+
+###########################################################################
+
+class DisplayList: # shapes on top of a background, and the canvas they make
+    def __init__(self, canvas, stamps):
+        self.stamps = stamps
+        self.reset(canvas)
+
+    def reset(self, canvas): # forget every shape -- canvas becomes the new background
+        # (used when an edit can't be kept as a shape, or the canvas is changed by undo, clear, or load)
+        self.background = canvas.copy()
+        self.canvas = canvas.copy() # background with every shape drawn on it
+        self.shapes = {} # id: operation
+        self.rects = {} # id: Rect around the shape
+        self.footprints = {} # id: (column, row) of each square of the shape's sprite (see split_sprite)
+        self.sprites = {} # id: ({(column, row): square}, table, bytes), the shape drawn last at the end
+        self.spriteBytes = 0 # memory used by the sprites
+        self.cells = {} # (column, row): set of ids of the shapes that overlap the cell
+        self.nextId = 0 # ids are also the order the shapes are drawn in
+        self.under = None # (id, surface, cells it is drawn in) for the shape being dragged (see under_layer)
+
+    def cells_in(self, rect): # list of cells that overlap a Rect
+        rect = rect.clip(self.canvas.get_rect())
+        if rect.w == 0 or rect.h == 0:
+            return []
+        return [(i, j) for i in range(rect.left//cellSize, (rect.right-1)//cellSize+1)
+                       for j in range(rect.top//cellSize, (rect.bottom-1)//cellSize+1)]
+
+    def shape_cells(self, shapeId, margin = hitMargin): # set of cells a shape's sprite draws on (or can be clicked on)
+        rect = self.rects[shapeId]
+        if shapeId not in self.footprints: # a marker without numpy has no sprite
+            return set(self.cells_in(rect))
+        cells = set()
+        for column, row in self.footprints[shapeId]:
+            part = square_rect(column, row, rect.size).move(rect.topleft)
+            cells.update(self.cells_in(part.inflate(2*margin, 2*margin)))
+        return cells
+
+    def index(self, shapeId): # add a shape to the cells it overlaps
+        self.rects[shapeId] = op_rect(self.shapes[shapeId])
+        for cell in self.shape_cells(shapeId):
+            self.cells.setdefault(cell, set()).add(shapeId)
+
+    def unindex(self, shapeId): # remove a shape from the cells it overlaps
+        for cell in self.shape_cells(shapeId):
+            self.cells[cell].discard(shapeId)
+
+    def add(self, op): # add a shape on top of the others -- returns its id
+        shapeId = self.nextId
+        self.nextId += 1
+        self.shapes[shapeId] = op
+        self.rects[shapeId] = op_rect(op)
+        self.under = None
+        if op['op'] != 'marker' or numpy != None:
+            self.sprite(shapeId) # which cells it is in depends on the squares of its sprite
+        self.index(shapeId)
+        self.draw_shape(shapeId) # nothing is on top of it, so it can be drawn straight away
+        return shapeId
+
+    def sprite(self, shapeId): # ({(column, row): square}, table, bytes) for a shape -- made again if it was thrown away
+        # i.e. the sprites that were drawn longest ago are thrown away while they take more than spriteMemory
+        if shapeId in self.sprites:
+            sprite = self.sprites.pop(shapeId) # put at the end again
+            self.sprites[shapeId] = sprite
+            return sprite
+        op, rect = self.shapes[shapeId], self.rects[shapeId]
+        table = None
+        if op['op'] == 'marker':
+            counts, table = make_sprite(op, rect, self.stamps, self.canvas)
+            squares = split_sprite(counts, rect.size)
+            size = table.nbytes + sum(square.nbytes for square in squares.values())
+        else:
+            squares = split_sprite(make_sprite(op, rect, self.stamps, self.canvas), rect.size)
+            size = sum(square.get_width()*square.get_height()*square.get_bytesize() for square in squares.values())
+        self.footprints[shapeId] = list(squares)
+        while self.spriteBytes + size > spriteMemory and len(self.sprites) > 0:
+            oldest = next(iter(self.sprites))
+            self.spriteBytes -= self.sprites.pop(oldest)[2]
+        self.sprites[shapeId] = (squares, table, size)
+        self.spriteBytes += size
+        return self.sprites[shapeId]
+
+    def draw_shape(self, shapeId, canvas = None): # draw one shape onto the canvas (only inside the canvas's clip)
+        canvas = self.canvas if canvas == None else canvas
+        op = self.shapes[shapeId]
+        if op['op'] == 'marker' and numpy == None:
+            apply_op(op, canvas, self.stamps)
+            return
+        rect = self.rects[shapeId]
+        area = rect.clip(canvas.get_clip())
+        if area.w == 0 or area.h == 0:
+            return
+        squares, table, size = self.sprite(shapeId)
+        # only the squares inside the clip are looked at
+        step = square_size(rect.size)
+        columns = range((area.left-rect.x)//step, (area.right-1-rect.x)//step+1)
+        rows = range((area.top-rect.y)//step, (area.bottom-1-rect.y)//step+1)
+        keys = [(column, row) for column in columns for row in rows if (column, row) in squares]
+        if op['op'] != 'marker':
+            for column, row in keys:
+                canvas.blit(squares[column, row], (rect.x+column*step, rect.y+row*step))
+            return
+        if len(keys) == 0:
+            return
+        # each channel on its own is much faster than pixels3d, whose channels are in the opposite order
+        channels = [surfarray.pixels_red(canvas), surfarray.pixels_green(canvas), surfarray.pixels_blue(canvas)]
+        for column, row in keys:
+            counts = squares[column, row]
+            left, top = rect.x+column*step, rect.y+row*step # where the square is on the canvas
+            part = Rect(left, top, *counts.shape).clip(area)
+            rows = counts[part.left-left:part.right-left, part.top-top:part.bottom-top].astype(numpy.int32)*256
+            for channel, values in zip(channels, table): # indexed [x, y], and changes the surface directly
+                covered = channel[part.left:part.right, part.top:part.bottom]
+                covered[...] = values.take(rows + covered) # one numpy.take for the whole square
+                del covered
+        del channels # unlock the canvas
+
+    def hit(self, x, y): # id of the top shape at (x, y), or None
+        for shapeId in sorted(self.cells.get((x//cellSize, y//cellSize), []), reverse = True):
+            if self.rects[shapeId].collidepoint(x, y) and hit_op(self.shapes[shapeId], x, y):
+                return shapeId
+        return None
+
+    def move(self, shapeId, dx, dy): # move a shape -- returns the Rect of the canvas that was redrawn
+        cells = self.shape_cells(shapeId, 0) # only where it was drawn, and where it will be drawn, changes
+        self.unindex(shapeId)
+        move_op(self.shapes[shapeId], dx, dy)
+        self.index(shapeId)
+        return self.redraw_cells(cells | self.shape_cells(shapeId, 0), shapeId)
+
+    def remove(self, shapeId): # delete a shape -- returns the Rect of the canvas that was redrawn
+        self.unindex(shapeId)
+        rect = self.rects.pop(shapeId)
+        del self.shapes[shapeId]
+        self.footprints.pop(shapeId, None)
+        self.under = None
+        if shapeId in self.sprites:
+            self.spriteBytes -= self.sprites.pop(shapeId)[2]
+        return self.redraw(rect)
+
+    def redraw(self, rect, moving = None): # redraw the cells that overlap a Rect -- returns the Rect of the canvas that was redrawn
+        # i.e. while a shape is dragged (moving is its id), the shapes under it come from under_layer
+        cells = self.cells_in(rect)
+        if len(cells) == 0:
+            return Rect(0, 0, 0, 0)
+        # cells_in gives a block of cells, from its top left cell to its bottom right cell
+        redrawRect = Rect(cells[0][0]*cellSize, cells[0][1]*cellSize, 0, 0).union(
+                     Rect(cells[-1][0]*cellSize, cells[-1][1]*cellSize, cellSize, cellSize)).clip(self.canvas.get_rect())
+        shapeIds = set()
+        for cell in cells:
+            shapeIds.update(self.cells.get(cell, []))
+        self.canvas.set_clip(redrawRect) # shapes are only drawn inside the cells
+        if moving == None:
+            self.canvas.blit(self.background, redrawRect.topleft, redrawRect)
+        else:
+            self.canvas.blit(self.under_layer(moving, cells), redrawRect.topleft, redrawRect)
+            shapeIds = [i for i in shapeIds if i >= moving]
+        for shapeId in sorted(shapeIds):
+            self.draw_shape(shapeId)
+        self.canvas.set_clip(None)
+        return redrawRect
+
+    def redraw_cells(self, cells, moving = None): # redraw a set of cells -- returns the Rect around what was redrawn
+        rects = cell_rects(cells)
+        if len(rects) == 0:
+            return Rect(0, 0, 0, 0)
+        return Rect(rects[0]).unionall([self.redraw(rect, moving) for rect in rects])
+
+    def under_layer(self, shapeId, cells): # the background with the shapes under a shape drawn on it, in these cells
+        # i.e. while a shape is dragged, the shapes under it are only drawn in the cells it wasn't over yet, so each
+        # frame only draws the shape and the shapes on top of it
+        if self.under == None or self.under[0] != shapeId: # the surface is used again, but none of its cells
+            surface = self.under[1] if self.under != None else Surface(self.canvas.get_size(), 0, self.canvas)
+            self.under = (shapeId, surface, set())
+        surface, done = self.under[1], self.under[2]
+        cells = [cell for cell in cells if cell not in done]
+        for rect in cell_rects(cells):
+            shapeIds = set()
+            for cell in self.cells_in(rect):
+                shapeIds.update(self.cells.get(cell, []))
+            surface.set_clip(rect)
+            surface.blit(self.background, rect.topleft, rect)
+            for i in sorted(shapeIds):
+                if i < shapeId:
+                    self.draw_shape(i, surface)
+        surface.set_clip(None)
+        done.update(cells)
+        return surface
+
+###########################################################################
+
+def random_shape(): # random operation that can be kept as a shape (for bench)
+    kind = choice(vector_ops)
+    colour = [randint(0, 255), randint(0, 255), randint(0, 255)]
+    x, y = randint(0, 749), randint(0, 549)
+    if kind in shape_tools:
+        return {'op': kind, 'colour': colour, 'start': [x, y], 'end': [x+randint(-60, 60), y+randint(-60, 60)]}
+    elif kind == 'stamp':
+        return {'op': kind, 'name': choice(list(stamp_files)), 'point': [x, y]}
+    elif kind == 'text':
+        return {'op': kind, 'colour': colour, 'point': [x, y], 'text': 'shape'}
+    points = [[x+randint(-40, 40), y+randint(-40, 40)] for i in range(randint(3, 6))]
+    return {'op': kind, 'colour': colour, 'points': points, 'seed': randint(0, 9999)}
+
+def random_stroke(): # random stroke anywhere on the canvas, like the ones people really draw (for bench)
+    points = [[randint(0, 749), randint(0, 549)] for i in range(6)]
+    colour = [randint(0, 255), randint(0, 255), randint(0, 255)]
+    return {'op': choice(['brush', 'marker', 'pencil']), 'colour': colour, 'points': points, 'seed': randint(0, 9999)}
+
+def drag(display, shapeId, frames): # drag a shape around -- average and worst time of one frame
+    total, worst = 0, 0
+    for i in range(frames):
+        moveStart = time.time()
+        display.move(shapeId, randint(-5, 5), randint(-5, 5))
+        total += time.time() - moveStart
+        worst = max(worst, time.time() - moveStart)
+    return total/frames, worst
+
+def bench(shapes = 2000, moves = 200, strokes = 300): # time adding, hitting, and moving shapes
+    init()
+    seed(1)
+    canvas = Surface(canvasSize)
+    canvas.fill(WHITE)
+    display = DisplayList(canvas, load_stamps())
+    start = time.time()
+    for i in range(shapes):
+        display.add(random_shape())
+    addTime = time.time() - start
+
+    start = time.time()
+    hits = [display.hit(randint(0, 749), randint(0, 549)) for i in range(1000)]
+    hitTime = time.time() - start
+
+    start = time.time()
+    worst = 0
+    for i in range(moves):
+        shapeId = choice([i for i in hits if i != None])
+        moveStart = time.time()
+        display.move(shapeId, randint(-5, 5), randint(-5, 5)) # like one frame of dragging a shape
+        worst = max(worst, time.time() - moveStart)
+    moveTime = time.time() - start
+
+    moved = image.tostring(display.canvas, 'RGB')
+    display.redraw(display.canvas.get_rect()) # every shape drawn again, to check the cells that were redrawn
+    same = image.tostring(display.canvas, 'RGB') == moved
+
+    print('%i shapes: add %.2f ms each' % (shapes, 1000*addTime/shapes))
+    print('hit test: %.3f ms each (%i of 1000 clicks found a shape)' % (hitTime, len([i for i in hits if i != None])))
+    print('move (one drag frame): %.1f ms on average, %.1f ms at worst' % (1000*moveTime/moves, 1000*worst))
+    print('canvas the same as drawing every shape again: %s' % same)
+
+    # long strokes across the canvas, with a stamp among them
+    if strokes == 0:
+        return
+    display = DisplayList(canvas, load_stamps())
+    start = time.time()
+    for i in range(strokes):
+        display.add(random_stroke())
+    addTime = time.time() - start
+    stamp = display.add({'op': 'stamp', 'name': 'earth', 'point': [375, 275]})
+    stampAverage, stampWorst = drag(display, stamp, moves)
+    strokeAverage, strokeWorst = drag(display, randint(0, strokes-1), 20)
+    moved = image.tostring(display.canvas, 'RGB')
+    display.redraw(display.canvas.get_rect())
+    same = image.tostring(display.canvas, 'RGB') == moved
+    print('%i long strokes: add %.2f ms each, %.1f MB of sprites' % (strokes, 1000*addTime/strokes, display.spriteBytes/1024/1024))
+    print('move a stamp among them: %.1f ms on average, %.1f ms at worst' % (1000*stampAverage, 1000*stampWorst))
+    print('move a long stroke: %.1f ms on average, %.1f ms at worst' % (1000*strokeAverage, 1000*strokeWorst))
+    print('canvas the same as drawing every shape again: %s' % same)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Measure the display list used by vector mode.')
+    parser.add_argument('--shapes', type = int, default = 2000)
+    parser.add_argument('--moves', type = int, default = 200)
+    parser.add_argument('--strokes', type = int, default = 300, help = 'long strokes across the canvas')
+    args = parser.parse_args()
+    bench(args.shapes, args.moves, args.strokes)
@@ -6,131 +6,186 @@
 # stamps that the user can place on the canvas. The user can also undo their last edit, clear the canvas to
 # start over, and load or save a canvas from or to a bitmap file. The mouse position and a short description
 # of the current tool are also given. There is music playing in the background.
+# The program only draws frames while something is changing, and sleeps until the next event otherwise.
+# The drawing functions for the tools are in paint_tools.py. collab.py lets several users draw on the same canvas.
+# In vector mode (press V), finished shapes can be moved with the Move Shape tool (see display_list.py).
+# A drawing session can be recorded and exported as a timelapse video (see timelapse.py). The canvas can also be
+# saved with fewer colours, as pixel art (see quantize.py).
 
 ###########################################################################
 
+import sys
 from tkinter import *
 from pygame import *
 from random import *
 from math import *
+from paint_tools import *
+from collab import CollabClient, changed_tiles, encode_patch, undo_patch, decode_tiles
+from display_list import DisplayList, vector_ops
+from text_engine import TextLayout, get_atlas, font_families, text_sizes, maxText
+from timelapse import TimelapseRecorder
+from quantize import save_indexed, dithers, numpy # numpy is None when it isn't installed
+from time import perf_counter, process_time # after pygame, which has its own time module
+import threading
 
 ###########################################################################
 
-# functions for tools
-def line_points(oldx, oldy, mx, my): # list of points between (oldx, oldy) and (mx, my)
-    ans = []
-    dist = max(abs(mx-oldx), abs(my-oldy))
-    if dist == 0:
-        ans.append((mx, my))
-    for i in range(dist): # use similar triangles to find integer coordinates
-        newx = int(oldx+i*(mx-oldx)/dist)
-        newy = int(oldy+i*(my-oldy)/dist)
-        ans.append((newx, newy))
-    return ans
-
-def spray_paint(mx, my, radius, colour): # spray paint effect for a given point
-    for i in range(radius):
-        x = randint(0-radius, radius)
-        y = randint(0-radius, radius)
-        if hypot(x, y) <= radius: # make sure pixel is in the circle
-            screen.set_at((mx+x, my+y), colour)
-            
-def glitter_pt(mx, my, radius, colour): # glitter effect for a given point
-    x = randint(0-radius, radius)
-    y = randint(0-radius, radius)
-    r = randint(1, 3)
-    if hypot(x, y)+r <= radius:
-        draw.circle(screen, colour, (mx+x, my+y), r)
-        
-def bucket_fill(mx, my, oldColour, newColour, screen): # fill an area with the given colour
-    # i.e. checks if each pixel is the original colour; if so, fills it in and checks its four adjacent pixels
-    if oldColour != newColour:
-        points = {(mx, my)}
-        checked = set()
-        while len(points) > 0:
-            point = points.pop()
-            if point not in checked:
-                try:
-                    if screen.get_at(point) == oldColour:
-                        screen.set_at(point, newColour)
-                        x, y = point
-                        points.add((x-1, y))
-                        points.add((x+1, y))
-                        points.add((x, y-1))
-                        points.add((x, y+1))
-                except:
-                    pass
-                checked.add(point)
-                
-def incomplete_polygon(points, colour): # draw an incomplete polygon with the given points
-    # i.e. draws a line between every pair of adjacent points in the list, but not between the first and last points
-    for i in range(len(points)-1):
-        x1, y1 = points[i]
-        x2, y2 = points[i+1]
-        for j in line_points(x1, y1, x2, y2):
-            draw.circle(screen, colour, j, 2)
-        
-def blur_circ(x, y, canvasRect): # blur a circle with radius 20 around a point
-    # i.e. sets each point in the circle as the average colour of its adjacent pixels
-    cornerX, cornerY = x-20, y-20 # top left corner of the circle's circumscribed square
-    blurSurf = screen.subsurface(Rect(cornerX, cornerY, 40, 40)).copy()
-    blurSurf.set_colorkey((0, 1, 1, 0)) # for pixels not in the circle
-    for i in range(41):
-        for j in range(41):
-            if hypot(i-20, j-20) <= 20: # (i,j) on blurSurf corresponds to (cornerX+i,cornerY+j) on screen
-                # find the r, g, and b values of the pixel's adjacent points, then take their averages
-                xs = [k+cornerX for k in (i-1, i+1, i, i)]
-                ys = [k+cornerY for k in (j, j, j-1, j+1)]
-                r,g,b = [],[],[]
-                for k in range(4):
-                    if canvasRect.collidepoint(xs[k], ys[k]):
-                        colour = screen.get_at((xs[k], ys[k]))
-                        r.append(colour.r)
-                        g.append(colour.g)
-                        b.append(colour.b)
-                if len(r) > 0: # r, g, and b have the same number of elements
-                    avgR = sum(r)//len(r)
-                    avgG = sum(g)//len(g)
-                    avgB = sum(b)//len(b)
-                    blurSurf.set_at((i, j), (avgR ,avgG, avgB))
-            else:
-                blurSurf.set_at((i, j), (0, 1, 1, 0))
-    screen.blit(blurSurf, (cornerX, cornerY))
-    
-def pixel(x, y, canvasRect): # pixelate a 5 x 5 square around a given point
-    # i.e. fills a 5 x 5 square with the average colour of its pixels
-    x, y = x - x%5, y - y%5 # so the squares line up
-    # the following algorithm for the average rgb value is similar to the one used in the blur function
-    r, g, b = [], [], []
-    for i in range(x, x+5):
-        for j in range(y, y+5):
-            if canvasRect.collidepoint(i, j):
-                colour = screen.get_at((i, j))
-                r.append(colour.r)
-                g.append(colour.g)
-                b.append(colour.b)
-    if len(r) > 0: # r, g, and b have the same number of elements
-        avgR = sum(r)//len(r)
-        avgG = sum(g)//len(g)
-        avgB = sum(b)//len(b)
-        draw.rect(screen, (avgR, avgG, avgB), (x, y, 5, 5))
-        
-def cutout(selection_pts): # cut out polygon (for selection tool)
-    xs, ys = zip(*selection_pts)
-    minX, maxX = min(xs), max(xs)
-    minY, maxY = min(ys), max(ys)
-    new_pts = [(i-minX, j-minY) for (i, j) in selection_pts] # "shift" points to fit on a smaller surface
-    selectRect = Rect((minX, minY, maxX-minX+1, maxY-minY+1))
-    select_surface = screen.subsurface(selectRect).copy() # smallest surface that contains the whole polygon
-    select_surface.set_colorkey((0, 1, 0, 0))
-    shape_surface = Surface((maxX-minX+1, maxY-minY+1))
-    shape_surface.fill((0, 1, 0, 0)) # second surface filled with the first surface's colorkey
-    shape_surface.set_colorkey((0, 1, 1, 0))
-    draw.polygon(shape_surface, (0, 1, 1, 0), new_pts) # transparent polygon drawn on second surface
-    select_surface.blit(shape_surface, (0, 0)) # when the 2nd surface is blitted over the 1st, the selected
-                                             # polygon remains visible while the rest becomes transparent
+# functions for tools (the other tools are in paint_tools.py)
+def near_point(point, mx, my, dist = 5): # whether (mx, my) is less than dist away from point
+    # i.e. compares squared distances, after a quick check on each axis, instead of calling hypot
+    dx, dy = point[0]-mx, point[1]-my
+    return -dist < dx < dist and -dist < dy < dist and dx*dx + dy*dy < dist*dist
+
+def add_path_edge(path_cover, point1, point2, colour): # draw one committed edge of a polygon or selection path
+    # i.e. the edge is drawn once onto path_cover (a copy of the canvas) instead of on every frame
+    x1, y1 = point1
+    x2, y2 = point2
+    for j in line_points(x1, y1, x2, y2) + [point2]:
+        draw.circle(path_cover, colour, (j[0]-250, j[1]-150), 2)
+        draw.circle(screen, colour, j, 2) # in case the mouse jumped since the last rubber-band segment
+
+def preview_path(path_cover, path_rect, point, mx, my, colour): # rubber-band segment from the last vertex to the mouse
+    # i.e. restores the area covered by the previous segment from path_cover, then draws the new segment
+    if path_rect != None:
+        screen.blit(path_cover, path_rect.topleft, path_rect.move(-250, -150))
+    x, y = point
+    new_rect = Rect(min(x, mx)-3, min(y, my)-3, abs(mx-x)+7, abs(my-y)+7) # area covered by the new segment
+    for j in line_points(x, y, mx, my):
+        draw.circle(screen, colour, j, 2)
+    return new_rect.clip(canvasRect)
+
+def selection_handle(mx, my, rect): # part of the selection at (mx, my): 'scale', 'rotate', 'move', or None
+    for corner in [rect.topleft, rect.topright, rect.bottomleft, rect.bottomright]:
+        if near_point(corner, mx, my, 8):
+            return 'scale'
+    if near_point((rect.centerx, rect.top-20), mx, my, 8):
+        return 'rotate'
+    if rect.collidepoint(mx, my):
+        return 'move'
+    return None
+
+def draw_handles(rect): # box around the selection, with scale handles at the corners and a rotate handle above it
+    # returns the Rect of the screen that was drawn on
+    draw.rect(screen, (0, 225, 0), rect, 1)
+    draw.line(screen, (0, 225, 0), (rect.centerx, rect.top), (rect.centerx, rect.top-20))
+    draw.circle(screen, (0, 225, 0), (rect.centerx, rect.top-20), 5)
+    for (x, y) in [rect.topleft, rect.topright, rect.bottomleft, rect.bottomright]:
+        draw.rect(screen, (0, 225, 0), (x-3, y-3, 7, 7))
+    return rect.inflate(8, 8).union(Rect(rect.centerx-6, rect.top-26, 13, 27))
+
+def selection_preview(angle, scale): # quick, low quality copy of the selection while a handle is dragged
+    # i.e. rotates a small copy of the selection (cached for every 2 degrees), then stretches it with
+    # nearest-neighbour scaling, so the time per frame doesn't depend on how big the selection is
+    step = round(angle/2) % 180
+    if step not in select_cache:
+        select_cache[step] = transform.rotate(select_proxy, step*2)
+    rotated = select_cache[step]
+    factor = scale * select_surface.get_width() / select_proxy.get_width()
+    w, h = rotated.get_size()
+    return transform.scale(rotated, (max(int(w*factor), 1), max(int(h*factor), 1)))
+
+def resample_selection(job): # full quality rotate and scale of the selection (runs on a worker thread)
+    job['result'] = transform_selection(job['surface'], job['angle'], job['scale'])
+
+def selection_picture(): # the selection as it should be shown this frame
+    if select_mode in ['scale', 'rotate'] or (select_job != None and 'result' not in select_job):
+        return selection_preview(select_angle, select_scale) # the full quality one isn't ready yet
+    if select_job != None:
+        select_job['shown'] = True
+        return select_job['result']
     return select_surface
 
+def let_go_handle(): # a handle was let go -- start the full quality resample, and show the preview until it's done
+    global select_mode, select_job
+    if select_mode != 'move':
+        select_job = None
+        if (select_angle, select_scale) != (0, 1):
+            select_job = {'surface': select_surface, 'angle': select_angle, 'scale': select_scale}
+            select_job['thread'] = threading.Thread(target = resample_selection, args = (select_job,), daemon = True)
+            select_job['thread'].start()
+    select_mode = None
+
+def place_selection(): # put the selection down, in full quality, and finish the edit (for selection tool)
+    global selected, selection_pts, select_mode
+    if select_job != None:
+        select_job['thread'].join()
+    if select_job != None and (select_job['angle'], select_job['scale']) == (select_angle, select_scale):
+        pic = select_job['result']
+    else: # a handle was still being dragged, so there is no full quality copy at this angle and scale yet
+        pic = transform_selection(select_surface, select_angle, select_scale)
+    select_mode = None
+    clip = screen.get_clip()
+    screen.set_clip(canvasRect)
+    screen.blit(select_back, (250, 150))
+    w, h = pic.get_size()
+    screen.blit(pic, (selectX-w//2, selectY-h//2))
+    screen.set_clip(clip)
+    finish_op({'op': 'selection', 'points': canvas_points(selection_pts), 'point': [selectX-250, selectY-150],
+               'angle': select_angle, 'scale': select_scale})
+    commit_edit()
+    selected = False
+    selection_pts = []
+
+def show_page(page): # show a page of the left toolbar, and which tab is selected
+    for i in range(len(toolbar_tabs)):
+        tab = toolbar_tabs[i]
+        if i == page:
+            draw.rect(screen, toolbarColour, tab)
+            draw.line(screen, toolbarColour, (48, tab.top), (48, tab.bottom-1), 3)
+        else:
+            draw.rect(screen, toolbarDark, tab)
+            draw.line(screen, boxColour, (48, tab.top), (48, tab.bottom-1), 3)
+    screen.blit(toolbar_surfaces[page], (50, 150))
+
+def send_op(op): # in collaboration mode, send an edit to the server (coordinates relative to the canvas)
+    if collab != None:
+        collab.send(op)
+
+def canvas_points(points): # points relative to the top left corner of the canvas (for operations)
+    return [[x-250, y-150] for (x, y) in points]
+
+def show_title(vector): # window title -- shows vector mode, and when the collaboration server was lost
+    title = 'Celestial Paint'
+    if vector:
+        title += ' - Vector Mode'
+    if collab != None and not collab.connected:
+        title += ' - Disconnected (drawing offline)'
+    display.set_caption(title)
+
+def vector_mode(on): # turn vector mode on or off -- returns the display list of the shapes (None when off)
+    show_title(on)
+    if on:
+        return DisplayList(undo_back, load_stamps())
+    return None
+
+def add_shape(op): # in vector mode, keep a finished edit as a shape (op is None for edits that can't be kept)
+    if shapes != None:
+        if op != None and op['op'] in vector_ops:
+            rect = shapes.rects[shapes.add(op)].clip(shapes.canvas.get_rect())
+            screen.blit(shapes.canvas, (rect.x+250, rect.y+150), rect) # spray and glitter are redrawn from their seed
+        else: # the whole canvas becomes the background of the shapes
+            shapes.reset(screen.subsurface(canvasRect))
+
+def finish_op(op): # an edit is finished -- send it in collaboration mode, and keep it as a shape in vector mode
+    send_op(op)
+    add_shape(op)
+
+def commit_edit(): # an edit on the canvas is finished -- keep the canvas from before it for undo
+    global undo_back
+    canvas = screen.subsurface(canvasRect).copy()
+    if collab != None: # only the pixels this edit changed, so undoing it doesn't erase what the other users drew
+        tiles = changed_tiles(canvas, undo_back)
+        undo_patches.append((encode_patch(undo_back, canvas, tiles), encode_patch(canvas, undo_back, tiles)))
+    undo_backs.append(undo_back)
+    undo_back = canvas
+
+def recorded_canvas(): # the canvas the timelapse recorder keeps -- only what is really drawn on it
+    # i.e. while the selection's handles, an unfinished polygon or selection, text that is being typed, or the box
+    # around a moving shape are shown, the canvas from before that edit is recorded until the edit is finished
+    if selected or typing or moving != None or len(selection_pts) + len(polygon_pts) + len(polygonF_pts) > 0:
+        return undo_back
+    return screen.subsurface(canvasRect)
+
 ###########################################################################
 
 # basic display screen
@@ -156,7 +211,6 @@ BLACK = (0, 0, 0)
 
 # fonts
 trebuchetFont14 = font.SysFont("trebuchetms", 14, bold = True)
-texttoolFont = font.SysFont("trebuchetms", 20, bold = True) # font for text tool
 logoFont = font.SysFont("trebuchetms", 115, bold = True) # text for logo
 timesFont30 = font.SysFont("timesnewroman", 30)
 titleFont = font.SysFont("trebuchetms", 15, bold = True) # font for names of tools
@@ -180,16 +234,18 @@ draw.line(screen, boxColour, (50, 527), (200, 527), 4)
 # left toolbar page selection
 toolbar_tab1 = Rect(27, 150, 20, 97) # Rect for page 1 tab of left toolbar
 toolbar_tab2 = Rect(27, 250, 20, 98) # Rect for page 2 tab of left toolbar
+toolbar_tab3 = Rect(27, 350, 20, 70) # Rect for page 3 tab of left toolbar
 toolbar_surface1 = Surface((150, 272)) # surface for page 1 of left toolbar
 toolbar_surface1.fill(toolbarColour)
 toolbar_surface2 = Surface((150, 272)) # surface for page 2 of left toolbar
 toolbar_surface2.fill(toolbarColour)
-draw.rect(screen, boxColour, (25, 148, 24, 202), 3)
+toolbar_surface3 = Surface((150, 272)) # surface for page 3 of left toolbar
+toolbar_surface3.fill(toolbarColour)
+toolbar_tabs = [toolbar_tab1, toolbar_tab2, toolbar_tab3]
+toolbar_surfaces = [toolbar_surface1, toolbar_surface2, toolbar_surface3]
+draw.rect(screen, boxColour, (25, 148, 24, 274), 3)
 draw.line(screen, boxColour, (25, 248), (49, 248), 3)
-draw.rect(screen, toolbarColour, toolbar_tab1) # show that page 1 is selected
-draw.rect(screen, toolbarDark, toolbar_tab2)
-draw.line(screen, toolbarColour, (48, 150), (48, 246), 3)
-draw.line(screen, boxColour, (48, 250), (48, 347), 3)
+draw.line(screen, boxColour, (25, 348), (49, 348), 3)
 
 # right toolbar
 draw.rect(screen, toolbarColour, (1050, 150, 150, 550))
@@ -234,6 +290,17 @@ for i in range(435, 488, 52):
     for j in range(1060, 1131, 70):
         toolRects.append(Rect(j, i, 60, 41))
         draw.rect(screen, WHITE, (j, i, 60, 41))
+
+# left toolbar page 3 (same rects and borders as page 1 and 2)
+move_shape, smudge_tool = range(34, 36)
+page3_tools = [move_shape, smudge_tool]
+for i in range(len(page3_tools)):
+    j, k = 161 + i//2*52, 60 + i%2*70
+    toolRects.append(Rect(k, j, 60, 41))
+    draw.rect(toolbar_surface3, WHITE, (k-50, j-150, 60, 41))
+
+# tools on each page of the left toolbar
+page_tools = [list(range(10)), list(range(10, 20)), page3_tools]
         
 # ink tool
 ink_cover = Surface((1200, 675)).convert() # surface for ink tool
@@ -248,6 +315,8 @@ marker_cover.set_colorkey((0, 1, 1, 0))
 
 # polygon tool
 polygon_pts = [] # list of points for polygon tool
+path_cover = None # canvas with the committed edges of the current polygon or selection path
+path_rect = None # area of the canvas covered by the last rubber-band segment
 
 # filled polygon tool
 polygonF_pts = [] # list of points for filled polygon tool
@@ -255,14 +324,37 @@ polygonF_pts = [] # list of points for filled polygon tool
 # text tool
 text = '' # keyboard input for text tool
 typing = False # for text tool, whether or not the user has clicked the canvas to start/stop typing
+textLayout = TextLayout() # the text being typed, laid out and drawn (see text_engine.py)
+text_rect = None # area of the screen covered by the text in the last frame
+textFamily = 0 # index of the font in font_families
+textSize = text_sizes.index(20) # index of the font size in text_sizes
 
 # selection tool
 selection_pts = [] # list of points for selection tool
 selected = False # for selection tool, whether or not the user selected a polygon
+select_mode = None # 'follow' while the selection follows the mouse, 'move', 'scale', or 'rotate' while a handle is
+                   # dragged, None while it waits to be placed
+selectX, selectY = 0, 0 # centre of the selection on the screen
+select_angle, select_scale = 0, 1 # rotation (degrees counterclockwise) and size of the selection
+select_start = None # mouse position, centre, angle, and scale when a handle was pressed
+select_back = None # canvas with a white hole where the selection was cut out
+select_rect = None # area of the screen covered by the selection and its handles in the last frame
+select_pic_rect = None # area of the screen covered by the selection
+select_proxy = None # small copy of the selection, for previews
+select_cache = {} # rotated copies of select_proxy, for every 2 degrees
+select_job = None # full quality rotate and scale of the selection, done on a worker thread
+
+# move shape tool
+moving = None # id of the shape being moved
+highlight = None # Rect of the box around the shape being moved (relative to the canvas)
+
+# smudge tool
+smudge_buffer = None # colours the smudge brush is carrying
 
 # undo tool
 undo_back = screen.subsurface(canvasRect).copy() # current canvas (also used in some other tools)
 undo_backs = [undo_back] # list of canvas surfaces
+undo_patches = [] # collaboration mode: for each edit, the pixels it changed, as they were before and after it
 
 # colour palette
 paletteRect = Rect(50, 530, 150, 170) # Rect for colour palette
@@ -317,6 +409,13 @@ toolbar_surface2.blit(transform.scale(pixelatePic, (30, 30)), (25, 224))
 selectionPic = image.load("images/selection.jpg") # selection tool
 toolbar_surface2.blit(transform.scale(selectionPic, (30, 30)), (95, 224))
 
+# left toolbar page 3
+draw.rect(toolbar_surface3, 0, (21, 17, 26, 20)) # move shape -- a shape with an arrow
+draw.line(toolbar_surface3, 0, (40, 30), (59, 44), 3)
+draw.polygon(toolbar_surface3, 0, [(61, 46), (51, 45), (58, 37)])
+for i in range(5): # smudge -- a smear that fades out
+    draw.circle(toolbar_surface3, (40*i, 40*i, 40*i), (90+9*i, 31-2*i), 10-i)
+
 # right upper toolbar (stamps)
 earthPic = image.load("images/earth.png") # earth
 stamp_earth = transform.scale(earthPic, (90, 90))
@@ -398,7 +497,9 @@ tool_names = ['Pencil',
               'Undo',
               'Clear',
               'Load',
-              'Save'] # list of strings with the name of each tool -- same indices as toolRects and toolBorders
+              'Save',
+              'Move Shape',
+              'Smudge'] # list of strings with the name of each tool -- same indices as toolRects and toolBorders
             
 tool_texts = [['Click on the canvas to', 'draw thin lines.'],
               ['Click on the canvas to', 'erase work that was', 'done.'],
@@ -416,10 +517,10 @@ tool_texts = [['Click on the canvas to', 'draw thin lines.'],
               ['Click on the canvas to', 'draw. Gets darker', 'the longer you keep', 'the mouse pressed.'],
               ['Click on the canvas to', 'select points. Click on', 'the first vertex again', 'to close the polygon.'],
               ['Click on the canvas to', 'select points. Click on', 'the first vertex again', 'to close the polygon.'],
-              ['Click on the canvas to', 'start typing. Click', 'again to place the', 'text.'],
+              ['Click to type, click', 'again to place it. Up,', 'Down, Tab: size, font', '(Trebuchet, 20)'],
               ['Click on the canvas to', 'blur work that was', 'done.'],
               ['Click on the canvas to', 'turn work that was', 'done into pixel art.'],
-              ['Click points on the', 'canvas to cut out a', 'polygon. Click again', 'to place it.'],
+              ['Click points to cut out', 'a polygon. Click to put', 'it down, drag handles', 'to rotate and scale.'],
               ['Click on the canvas to', 'draw.'],
               ['Click on the canvas to', 'draw.'],
               ['Click on the canvas to', 'draw.'],
@@ -433,21 +534,29 @@ tool_texts = [['Click on the canvas to', 'draw thin lines.'],
               ['Undo the last edit', 'made.'],
               ['Clear the canvas and', 'start over.'],
               ['Load a canvas from a', 'bitmap file.'],
-              ['Save the canvas to a', 'bitmap file.']]
+              ['Save the canvas. Point', 'here and press C and D', 'for colours, dithering', '(all colours)'],
+              ['Click on a shape and', 'drag to move it. Press', 'V to turn vector mode', 'on or off.'],
+              ['Click and drag on the', 'canvas to smudge the', 'colours together.']]
             # list of lists of strings with descriptions of each tool ('\n' doesn't work when blitting text) -- same indices
 
 textRect = Rect(1050, 543, 150, 125) # will cover previous description         
 text_locations = [(1060, 580), (1060, 595), (1060, 610), (1060, 625)] # where to blit each line of text
 
+tool_ops = ['pencil', 'eraser', 'brush', 'spray', 'bucket', 'line', 'rectangle', 'rectangle_filled', 'oval', 'oval_filled',
+            'eyedropper', 'glitter', 'ink', 'marker', 'polygon', 'polygon_filled', 'text', 'blur', 'pixelate', 'selection',
+            'earth', 'moon', 'sun', 'stars', 'astronaut', 'shuttle', 'comet', 'asteroids', 'galaxy', 'satellite',
+            'undo', 'clear', 'load', 'save', 'move_shape', 'smudge']
+            # list of strings with the name of each tool in operations (see paint_tools.py) -- same indices
+
 ###########################################################################
 
 # set default tools
 tool = pencil # selected tool
 oldtool = pencil # will go back to previous tool when the user is done with undo, clear, load, or save
-tools_shown = list(range(10)) + list(range(20, 34)) # tools that are currently displayed on screen
+tools_shown = page_tools[0] + list(range(20, 34)) # tools that are currently displayed on screen
 
 # show left toolbar page 1
-screen.blit(toolbar_surface1, (50, 150))
+show_page(0)
 
 # draw boxes around tools
 for i in tools_shown:
@@ -474,16 +583,64 @@ oldx, oldy = 0, 0 # for straight line function
 startx, starty = 0, 0 # for line, rectangle, and oval tools
 pressL = False # whether or not the user clicked on left mouse button
 releaseL = False # whether or not the user released the left mouse button
+strokes = 0 # number of times the user clicked, so separate strokes aren't joined together (for collaboration mode)
+stroke_pts = [] # points of the current stroke (for collaboration mode and vector mode)
+
+# collaboration mode (see collab.py) -- python paint_project.py --join localhost:5050
+collab = None # connection to the server
+offline = False # whether the connection to the server was lost (the user keeps drawing on their own)
+if '--join' in sys.argv:
+    host, port = sys.argv[sys.argv.index('--join')+1].split(':')
+    collab = CollabClient(host, int(port))
+
+# timelapse recording (see timelapse.py) -- python paint_project.py --record session.tl
+recorder = None
+if '--record' in sys.argv:
+    recorder = TimelapseRecorder(sys.argv[sys.argv.index('--record')+1], canvasSize)
+
+# saving with fewer colours (see quantize.py) -- press C to change the colours, D to change the dithering, while
+# pointing at the save tool (so its description, which shows the setting, can be seen)
+# (number of colours, whether they are the fixed colours from the palette image) -- None saves every colour
+save_colours = [None, (256, False), (64, False), (16, False), (4, False), (64, True), (16, True)]
+saveColours = 0 # index in save_colours
+saveDither = 0 # index in dithers
+dither_names = {None: 'no dither', 'ordered': 'ordered', 'floyd': 'Floyd'}
+
+# vector mode (see display_list.py) -- press V to turn it on or off
+shapes = None # display list of the shapes on the canvas
+
+# frame scheduler
+clock = time.Clock()
+FPS = 60 # most frames per second, while something is changing
+redraw = True # draw the next frame straight away, instead of waiting for an event
+stepLength = 1000 / 60 # ms between steps of the continuous tools (airbrush, glitter, and marker)
+stepTime = 0 # ms since the last step
+continuous_tools = [spray, glitter, marker] # tools that keep painting while the mouse is pressed and still
+
+# python paint_project.py --stats prints idle CPU use and input-to-pixel latency when the program closes
+stats = '--stats' in sys.argv
+startTime, startCpu, frames = perf_counter(), process_time(), 0
+waitTime, waitCpu = 0, 0 # time spent waiting for events, and the CPU time used while waiting
+latencies = [] # ms from reading input to showing the frame it changed
 
 ###########################################################################
 
 running = True
 
 while running:
+    if redraw:
+        events = event.get()
+    else: # nothing is changing, so sleep until the user does something
+        # (in collaboration mode, wake up 30 times a second to check for edits from the server)
+        waitStart, cpuStart = perf_counter(), process_time()
+        events = [event.wait(33 if collab != None else 0)] + event.get()
+        waitTime += perf_counter() - waitStart
+        waitCpu += process_time() - cpuStart
+    inputTime = perf_counter()
     mx, my = mouse.get_pos() # the position of the mouse on the screen
     mb = mouse.get_pressed() # the state of the mouse buttons
-    
-    for evt in event.get():
+
+    for evt in events:
         if evt.type == QUIT:
             running = False
             
@@ -495,18 +652,56 @@ while running:
             if evt.button == 1:
                 pressL = True
                 startx, starty = mx, my
+                stroke_pts = []
+                smudge_buffer = None
+                strokes += 1
 
         if evt.type == KEYDOWN:
-            if tool == text_tool and typing: # record keyboard input for text tool
+            if tool == text_tool and evt.key in [K_UP, K_DOWN, K_TAB]: # change the size or font of the text tool
+                if evt.key == K_UP:
+                    textSize = min(textSize+1, len(text_sizes)-1)
+                elif evt.key == K_DOWN:
+                    textSize = max(textSize-1, 0)
+                else:
+                    textFamily = (textFamily+1) % len(font_families)
+                tool_texts[text_tool][3] = '(%s, %i)' % (font_families[textFamily][1], text_sizes[textSize])
+            elif tool == text_tool and typing: # record keyboard input for text tool
                 try:
                     if evt.key == K_BACKSPACE:
                         text = text[:-1]
-                    elif evt.key in [K_ESCAPE, K_TAB, K_RETURN, K_UP, K_DOWN, K_LEFT, K_RIGHT]:
+                    elif evt.key == K_RETURN:
+                        text = (text + '\n')[:maxText]
+                    elif evt.key in [K_ESCAPE, K_LEFT, K_RIGHT]:
                         continue
-                    else:
-                        text += evt.unicode
+                    else: # no more than the server accepts in one text operation
+                        text = (text + evt.unicode)[:maxText]
                 except:
                     pass
+            elif evt.key == K_v and moving == None:
+                shapes = vector_mode(shapes == None)
+            elif evt.key in [K_c, K_d] and toolRects[save].collidepoint(mx, my): # change how the save tool reduces
+                                                                                # the colours, while pointing at it
+                if evt.key == K_c:
+                    saveColours = (saveColours+1) % len(save_colours)
+                else:
+                    saveDither = (saveDither+1) % len(dithers)
+                if save_colours[saveColours] == None:
+                    tool_texts[save][3] = '(all colours)'
+                elif numpy == None: # the colours can't be reduced, so the save tool keeps them all
+                    tool_texts[save][3] = '(no numpy: all colours)'
+                else:
+                    colours, fixed = save_colours[saveColours]
+                    tool_texts[save][3] = '(%i %s, %s)' % (colours, 'fixed' if fixed else 'colours', dither_names[dithers[saveDither]])
+
+    # continuous tools paint once per step while the mouse is still, so they don't depend on the frame rate
+    if pressL:
+        stepTime = stepLength # one step for the click
+    steps = int(stepTime // stepLength)
+    stepTime -= steps*stepLength
+    if tool in continuous_tools and (mx, my) == (oldx, oldy):
+        dabs = steps # number of times to paint at the mouse this frame
+    else:
+        dabs = 1
     
     if canvasRect.collidepoint(mx, my): # only draw when mouse is on the canvas
         screen.set_clip(canvasRect)
@@ -528,56 +723,17 @@ while running:
 
         elif tool == spray:
             if mb[0] == 1:
-                for i in line_points(oldx, oldy, mx, my):
-                    spray_paint(i[0], i[1], 20, drawColour)
+                for i in line_points(oldx, oldy, mx, my)*dabs:
+                    spray_paint(i[0], i[1], 20, drawColour, screen)
 
         elif tool == bucket:
             if releaseL:
                 bucket_fill(mx, my, screen.get_at((mx, my)), drawColour, screen)
 
-        elif tool == line:
-            if mb[0] == 1:
-                screen.blit(undo_back, (250, 150))
-                for i in line_points(startx, starty, mx, my):
-                    draw.circle(screen, drawColour, i, 2)
-                
-        elif tool == rectangle:
-            if mb[0] == 1:
-                screen.blit(undo_back, (250, 150))
-                minx, miny = min(startx, mx), min(starty, my)
-                posw, posh = max(abs(mx-startx), 1), max(abs(my-starty), 1) # positive width and height of rectangle
-                rectangle_surface = Surface((posw, posh)) # surface for rectangle tool (unfilled)
-                rectangle_surface.fill(drawColour)
-                rectangle_surface.set_colorkey((1, 1, 1, 0))
-                if posw >= 7 and posh >= 7:
-                    draw.rect(rectangle_surface, (1, 1, 1, 0), (3, 3, posw-6, posh-6))
-                screen.blit(rectangle_surface, (minx, miny))
-
-        elif tool == rectangle_filled:
-            if mb[0] == 1:
-                screen.blit(undo_back, (250, 150))
-                drawRect = Rect(startx, starty, mx-startx, my-starty)
-                drawRect.normalize()
-                draw.rect(screen, drawColour, drawRect)
-
-        elif tool == oval:
-            if mb[0] == 1:
-                screen.blit(undo_back, (250, 150))
-                minx, miny = min(startx, mx), min(starty, my)
-                radx, rady = max(abs(mx-startx), 1), max(abs(my-starty), 1) # dimensions of ellipse
-                ellipse_surface = Surface((radx, rady)) # surface for oval tool (unfilled)
-                ellipse_surface.set_colorkey((1, 1, 1, 0))
-                ellipse_surface.fill((1, 1, 1, 0))
-                draw.ellipse(ellipse_surface, drawColour, (0, 0, radx, rady))
-                if radx >= 10 and rady >= 10:
-                    draw.ellipse(ellipse_surface, (1, 1, 1, 0), (3, 3, radx-6, rady-6))
-                screen.blit(ellipse_surface, (minx, miny))
-
-        elif tool == oval_filled:
+        elif tool in [line, rectangle, rectangle_filled, oval, oval_filled]:
             if mb[0] == 1:
                 screen.blit(undo_back, (250, 150))
-                radx, rady = max(abs(mx-startx), 1), max(abs(my-starty), 1) # dimensions of ellipse
-                draw.ellipse(screen, drawColour, (min(mx, startx), min(my, starty), radx, rady))
+                draw_shape(tool_ops[tool], startx, starty, mx, my, drawColour, screen)
 
         elif tool == eyedropper:
             if mb[0] == 1:
@@ -585,8 +741,8 @@ while running:
 
         elif tool == glitter:
             if mb[0] == 1:
-                for i in line_points(oldx, oldy, mx, my):
-                    glitter_pt(i[0], i[1], 20, drawColour)
+                for i in line_points(oldx, oldy, mx, my)*dabs:
+                    glitter_pt(i[0], i[1], 20, drawColour, screen)
 
         elif tool == ink:
             if mb[0]==1:
@@ -601,84 +757,114 @@ while running:
             if mb[0] == 1:
                 marker_cover.fill((0, 1, 1, 0))
                 draw.circle(marker_cover, drawColour, (21, 21), 20)
-                for i in line_points(oldx, oldy, mx, my):
+                for i in line_points(oldx, oldy, mx, my)*dabs:
                     screen.blit(marker_cover, (i[0]-21, i[1]-21))
 
         elif tool == polygon:
             if pressL:
-                if len(polygon_pts) > 0 and hypot(polygon_pts[0][0]-mx, polygon_pts[0][1]-my) < 5: # they don't have to click
-                                                                                                  # on the exact same pixel
+                if len(polygon_pts) > 0 and near_point(polygon_pts[0], mx, my): # they don't have to click
+                                                                                # on the exact same pixel
                     screen.blit(undo_back, (250, 150))
-                    if len(polygon_pts) > 1:
-                        draw.polygon(screen, drawColour, polygon_pts, 3)
-                    else:
-                        draw.circle(screen, drawColour, polygon_pts[0], 2)
-                    undo_backs.append(undo_back)
-                    undo_back = screen.subsurface(canvasRect).copy()
+                    draw_polygon(polygon_pts, drawColour, False, screen)
+                    finish_op({'op': 'polygon', 'colour': list(drawColour)[:3], 'points': canvas_points(polygon_pts)})
+                    commit_edit()
                     polygon_pts = []
                 else:
+                    if len(polygon_pts) == 0: # start a new path
+                        path_cover = undo_back.copy()
+                        path_rect = None
+                    else:
+                        add_path_edge(path_cover, polygon_pts[-1], (mx, my), drawColour)
                     polygon_pts.append((mx, my))
             elif len(polygon_pts) > 0:
-                screen.blit(undo_back, (250, 150))
-                incomplete_polygon(polygon_pts + [(mx, my)], drawColour)
+                path_rect = preview_path(path_cover, path_rect, polygon_pts[-1], mx, my, drawColour)
 
         elif tool == polygon_filled: # same as the empty polygon, but with thickness 0
             if pressL:
-                if len(polygonF_pts) > 0 and hypot(polygonF_pts[0][0]-mx, polygonF_pts[0][1]-my) < 5: # they don't have to click
-                                                                                                     # on the exact same pixel
+                if len(polygonF_pts) > 0 and near_point(polygonF_pts[0], mx, my): # they don't have to click
+                                                                                  # on the exact same pixel
                     screen.blit(undo_back, (250, 150))
-                    if len(polygonF_pts) > 2: # filled polygon requires at least 3 points
-                        draw.polygon(screen, drawColour, polygonF_pts)
-                    elif len(polygonF_pts) == 2: # regular polygon requires at least 2 points
-                        draw.polygon(screen, drawColour, polygonF_pts, 3)
-                    else:
-                        draw.circle(screen,drawColour, polygonF_pts[0], 2)
-                    undo_backs.append(undo_back)
-                    undo_back = screen.subsurface(canvasRect).copy()
+                    draw_polygon(polygonF_pts, drawColour, True, screen)
+                    finish_op({'op': 'polygon_filled', 'colour': list(drawColour)[:3], 'points': canvas_points(polygonF_pts)})
+                    commit_edit()
                     polygonF_pts = []
                 else:
+                    if len(polygonF_pts) == 0: # start a new path
+                        path_cover = undo_back.copy()
+                        path_rect = None
+                    else:
+                        add_path_edge(path_cover, polygonF_pts[-1], (mx, my), drawColour)
                     polygonF_pts.append((mx, my))
             elif len(polygonF_pts) > 0:
-                screen.blit(undo_back, (250, 150))
-                incomplete_polygon(polygonF_pts + [(mx, my)], drawColour)
+                path_rect = preview_path(path_cover, path_rect, polygonF_pts[-1], mx, my, drawColour)
 
         elif tool == text_tool: # get keyboard input in evt loop ^
+            if typing: # only the characters that changed are drawn again, and only the area the text covered is restored
+                textLayout.update(text, get_atlas(font_families[textFamily][0], text_sizes[textSize], drawColour))
+                if text_rect != None:
+                    screen.blit(undo_back, text_rect.topleft, text_rect.move(-250, -150))
+                text_rect = textLayout.draw(mx, my, screen).clip(canvasRect)
             if pressL:
                 if typing == False: # click to start typing
                     text = ''
                     typing = True
+                    text_rect = None
                 else: # click again to stop typing
-                    undo_backs.append(undo_back)
-                    undo_back = screen.subsurface(canvasRect).copy()
+                    finish_op({'op': 'text', 'text': text, 'colour': list(drawColour)[:3], 'point': [mx-250, my-150],
+                               'font': font_families[textFamily][0], 'size': text_sizes[textSize]})
+                    commit_edit()
                     text = ''
                     typing = False
-            if typing:
-                screen.blit(undo_back, (250, 150))
-                textPic = texttoolFont.render(text, True, drawColour)
-                w, h = textPic.get_size()
-                screen.blit(textPic, (mx-w//2, my-h//2))
 
         elif tool == blur:
             if mb[0] == 1:
-                blur_circ(mx, my, canvasRect)
+                blur_circ(mx, my, canvasRect, screen)
 
         elif tool == pixelate:
             if mb[0] == 1:
                 for i in range(mx-10, mx+11, 5):
                     for j in range(my-10, my+11, 5):
-                        pixel(i, j, canvasRect)
+                        pixel(i, j, canvasRect, screen)
 
         elif tool == selection:
             if selected:
-                screen.blit(undo_back, (250, 150))
-                draw.polygon(screen, WHITE, selection_pts)
-                w, h = select_surface.get_size()
-                screen.blit(select_surface, (mx-w//2, my-h//2))
                 if pressL:
-                    selected = False
-                    undo_backs.append(undo_back)
-                    undo_back = screen.subsurface(canvasRect).copy()
-                    selection_pts = []
+                    if select_mode == 'follow': # put it down here -- the handles can be dragged now
+                        select_mode = None
+                    else:
+                        select_mode = selection_handle(mx, my, select_pic_rect)
+                        select_start = (mx, my, selectX, selectY, select_angle, select_scale)
+                        if select_mode == None: # clicked somewhere else on the canvas
+                            place_selection()
+                elif select_mode in ['move', 'scale', 'rotate'] and (releaseL or mb[0] == 0):
+                    let_go_handle()
+
+                if selected: # it wasn't just placed
+                    if select_mode in ['move', 'scale', 'rotate']:
+                        px, py, startX, startY, startAngle, startScale = select_start
+                    if select_mode == 'follow':
+                        selectX, selectY = mx, my
+                    elif select_mode == 'move':
+                        selectX, selectY = startX+mx-px, startY+my-py
+                    elif select_mode == 'scale': # by how much further the mouse is from the centre
+                        select_scale = startScale * hypot(mx-selectX, my-selectY) / max(hypot(px-selectX, py-selectY), 1)
+                        smallest, largest = scale_limits(select_surface.get_size())
+                        select_scale = min(max(round(select_scale, 3), smallest), largest)
+                    elif select_mode == 'rotate': # by the angle the mouse moved around the centre
+                        turn = degrees(atan2(selectY-my, mx-selectX) - atan2(selectY-py, px-selectX))
+                        select_angle = round((startAngle + turn) % 360, 1)
+
+                    # only the area the selection and its handles covered in the last frame is restored
+                    pic = selection_picture()
+                    if select_rect != None:
+                        screen.blit(select_back, select_rect.topleft, select_rect.move(-250, -150))
+                    w, h = pic.get_size()
+                    select_pic_rect = Rect(selectX-w//2, selectY-h//2, w, h)
+                    screen.blit(pic, select_pic_rect)
+                    select_rect = select_pic_rect
+                    if select_mode != 'follow':
+                        select_rect = draw_handles(select_pic_rect)
+                    select_rect = select_rect.clip(canvasRect)
             else:
                 if len(selection_pts) == 0: # make sure selected polygon is visible
                     mbColour = screen.get_at((mx, my))
@@ -688,19 +874,32 @@ while running:
                     else: # black if light area is selected
                         selectColour = BLACK
                 if pressL:
-                    if len(selection_pts) > 0 and hypot(selection_pts[0][0]-mx, selection_pts[0][1]-my) < 5: # they don't have to click
-                                                                                                            # on the exact same pixel
+                    if len(selection_pts) > 0 and near_point(selection_pts[0], mx, my): # they don't have to click
+                                                                                        # on the exact same pixel
                         screen.blit(undo_back, (250, 150))
                         if len(selection_pts) > 2:
-                            select_surface = cutout(selection_pts)
+                            select_surface = cutout(selection_pts, screen)
                             selected = True
+                            select_mode = 'follow'
+                            selectX, selectY, select_angle, select_scale = mx, my, 0, 1
+                            select_back = undo_back.copy()
+                            draw.polygon(select_back, WHITE, canvas_points(selection_pts))
+                            screen.blit(select_back, (250, 150))
+                            select_rect = None
+                            select_proxy = transform_selection(select_surface, 0, min(128/max(select_surface.get_size()), 1))
+                            select_cache.clear()
+                            select_job = None
                         else:
                             selection_pts = []
                     else:
+                        if len(selection_pts) == 0: # start a new path
+                            path_cover = undo_back.copy()
+                            path_rect = None
+                        else:
+                            add_path_edge(path_cover, selection_pts[-1], (mx, my), selectColour)
                         selection_pts.append((mx, my))
                 elif len(selection_pts) > 0:
-                    screen.blit(undo_back, (250, 150))
-                    incomplete_polygon(selection_pts + [(mx, my)], selectColour)
+                    path_rect = preview_path(path_cover, path_rect, selection_pts[-1], mx, my, selectColour)
 
         elif tool == earth:
             if mb[0] == 1:
@@ -752,11 +951,63 @@ while running:
                 screen.blit(undo_back, (250, 150))
                 screen.blit(stamp_satellite, (mx-50, my-30))
 
+        elif tool == smudge_tool:
+            if mb[0] == 1:
+                smudge_buffer = smudge(oldx, oldy, mx, my, smudge_buffer, canvasRect, screen)
+
+        elif tool == move_shape:
+            if shapes == None:
+                shapes = vector_mode(True)
+            if pressL:
+                moving = shapes.hit(mx-250, my-150)
+                if moving != None:
+                    highlight = shapes.rects[moving].inflate(4, 4)
+            if moving != None:
+                if mb[0] == 1 and (mx, my) != (oldx, oldy):
+                    shapes.move(moving, mx-oldx, my-oldy)
+                # show where the shape and its box were and are now -- only this part of the canvas changed
+                area = highlight.union(shapes.rects[moving].inflate(4, 4)).clip(shapes.canvas.get_rect())
+                screen.blit(shapes.canvas, (area.x+250, area.y+150), area)
+                highlight = shapes.rects[moving].inflate(4, 4)
+                if releaseL or (mb[0] == 0 and not pressL): # shape was dropped (the box was removed above)
+                    if collab != None: # there is no operation for moving a shape, so send the pixels that changed
+                        send_op({'op': 'patch', 'tiles': encode_patch(screen.subsurface(canvasRect), undo_back)})
+                    moving = None
+                else:
+                    draw.rect(screen, (0, 225, 0), highlight.move(250, 150), 1) # green box around the shape
+
+        # send the edit to everyone else (collaboration mode), and keep it as a shape (vector mode)
+        # polygon, filled polygon, text, and selection tools do this seperately
+        if mb[0] == 1 and tool_ops[tool] in stroke_tools + ['ink', 'smudge'] and dabs > 0:
+            if len(stroke_pts) == 0:
+                stroke_pts.append((oldx, oldy))
+            stroke_pts += [(mx, my)]*dabs # the same point again for each extra step of a continuous tool
+            if tool_ops[tool] in stroke_tools: # ink and smudge are sent when they are finished
+                send_op({'op': tool_ops[tool], 'colour': list(drawColour)[:3], 'points': canvas_points([(oldx, oldy)] + [(mx, my)]*dabs),
+                         'stroke': strokes, 'seed': randint(0, 9999)})
+        elif mb[0] == 1 and tool_ops[tool] in point_tools:
+            send_op({'op': tool_ops[tool], 'points': canvas_points([(mx, my)]), 'stroke': strokes})
+        if releaseL:
+            if tool_ops[tool] in stroke_tools and len(stroke_pts) > 0:
+                add_shape({'op': tool_ops[tool], 'colour': list(drawColour)[:3], 'points': canvas_points(stroke_pts),
+                           'seed': randint(0, 9999)})
+            elif tool == ink and len(stroke_pts) > 0:
+                finish_op({'op': 'ink', 'colour': list(drawColour)[:3], 'points': canvas_points(stroke_pts)})
+            elif tool == smudge_tool and len(stroke_pts) > 0: # the smudge depends on everything it picked up along the way
+                finish_op({'op': 'smudge', 'points': canvas_points(stroke_pts)})
+            elif tool_ops[tool] in shape_tools:
+                finish_op({'op': tool_ops[tool], 'colour': list(drawColour)[:3], 'start': [startx-250, starty-150], 'end': [mx-250, my-150]})
+            elif tool == bucket:
+                finish_op({'op': 'bucket', 'colour': list(drawColour)[:3], 'point': [mx-250, my-150]})
+            elif tool in range(20, 30): # stamps
+                finish_op({'op': 'stamp', 'name': tool_ops[tool], 'point': [mx-250, my-150]})
+            elif tool_ops[tool] in point_tools:
+                add_shape(None)
+
         if releaseL and tool not in [eyedropper, polygon, polygon_filled, text_tool, selection]: # check if should append to undo list
                                             # don't append for eyedropper
                                             # append for polygon, filled polygon, text, and selection tools seperately
-            undo_backs.append(undo_back)
-            undo_back = screen.subsurface(canvasRect).copy()
+            commit_edit()
             releaseL = False
 
     else:
@@ -765,20 +1016,10 @@ while running:
             drawColour = screen.get_at((mx, my))
 
         # check if toolbar page is selected
-        if toolbar_tab1.collidepoint(mx, my) and mb[0] == 1:
-            draw.rect(screen, toolbarColour, toolbar_tab1) # show that page 1 is selected
-            draw.rect(screen, toolbarDark, toolbar_tab2)
-            draw.line(screen, toolbarColour, (48, 150), (48, 246), 3)
-            draw.line(screen, boxColour, (48, 250), (48, 347), 3)
-            tools_shown[:10] = list(range(10)) # replace second page with first page
-            screen.blit(toolbar_surface1, (50, 150))
-        elif toolbar_tab2.collidepoint(mx, my) and mb[0] == 1:
-            draw.rect(screen, toolbarDark, toolbar_tab1) # show that page 1 is selected
-            draw.rect(screen, toolbarColour, toolbar_tab2)
-            draw.line(screen, boxColour, (48, 150), (48, 246), 3)
-            draw.line(screen, toolbarColour, (48, 250), (48, 347), 3)
-            tools_shown[:10] = list(range(10, 20)) # replace first page with second page
-            screen.blit(toolbar_surface2, (50, 150))
+        for i in range(len(toolbar_tabs)):
+            if toolbar_tabs[i].collidepoint(mx, my) and mb[0] == 1:
+                show_page(i)
+                tools_shown = page_tools[i] + list(range(20, 34)) # replace the shown page
 
         # check if a tool is selected or hovered over
         # also show tool description
@@ -809,18 +1050,28 @@ while running:
         if tool in range(30, 34):
             if tool == undo:
                 if releaseL: # undo only once
-                    undo_back = undo_backs[-1]
-                    if len(undo_backs) > 1:
-                        screen.blit(undo_backs.pop(), (250, 150))
+                    if collab != None: # put back only the pixels of this user's last edit (see commit_edit)
+                        if len(undo_patches) > 0:
+                            patch = undo_patch(*undo_patches.pop(), screen.subsurface(canvasRect))
+                            undo_backs.pop()
+                            decode_tiles(patch, screen.subsurface(canvasRect), 'RGBA')
+                            send_op({'op': 'patch', 'tiles': patch})
+                            undo_back = screen.subsurface(canvasRect).copy()
                     else:
-                        screen.blit(undo_backs[0], (250, 150))
+                        undo_back = undo_backs[-1]
+                        if len(undo_backs) > 1:
+                            screen.blit(undo_backs.pop(), (250, 150))
+                        else:
+                            screen.blit(undo_backs[0], (250, 150))
+                    add_shape(None)
                     tool = oldtool
 
             elif tool == clear:
                 if releaseL: # screen is only cleared once
                     draw.rect(screen, WHITE, canvasRect)
-                    undo_backs.append(undo_back)
-                    undo_back = screen.subsurface(canvasRect).copy()
+                    send_op({'op': 'clear'})
+                    add_shape(None)
+                    commit_edit()
                     tool = oldtool
 
             elif tool == load:
@@ -830,8 +1081,10 @@ while running:
                     try:
                         upload = image.load(result)
                         screen.blit(upload, (250, 150))
-                        undo_backs.append(undo_back)
-                        undo_back = screen.subsurface(canvasRect).copy()
+                        if collab != None:
+                            send_op({'op': 'patch', 'tiles': encode_patch(screen.subsurface(canvasRect), undo_back)})
+                        add_shape(None)
+                        commit_edit()
                     except:
                         pass
                     tool = oldtool
@@ -839,8 +1092,11 @@ while running:
             elif tool == save:
                 if releaseL:
                     result = filedialog.asksaveasfilename()
-                    if result:
+                    if result and (save_colours[saveColours] == None or numpy == None): # numpy is needed to reduce colours
                         image.save(screen.subsurface(canvasRect), result + '.png')
+                    elif result: # 8-bit image with a palette
+                        colours, fixed = save_colours[saveColours]
+                        save_indexed(screen.subsurface(canvasRect), result + '.png', colours, fixed, dithers[saveDither])
                     tool = oldtool
 
         else:
@@ -848,6 +1104,19 @@ while running:
 
     screen.set_clip(0, 0, 1250, 750)
 
+    # collaboration mode: show the canvas that everyone agrees on, unless the user is in the middle of an edit
+    if collab != None:
+        collab.poll()
+        if not collab.connected and not offline:
+            offline = True
+            show_title(shapes != None)
+        if collab.changed and not collab.waiting() and mb[0] == 0 and not typing and not selected and moving == None:
+            if len(polygon_pts) == 0 and len(polygonF_pts) == 0 and len(selection_pts) == 0:
+                screen.blit(collab.canvas, (250, 150))
+                undo_back = collab.canvas.copy()
+                add_shape(None)
+                collab.changed = False
+
     # the following tools need to be reset if a new tool was chosen
     if tool != polygon:
         polygon_pts = []
@@ -856,7 +1125,13 @@ while running:
     if tool != text_tool:
         text = ''
         typing = False
+    if tool != move_shape:
+        moving = None
+    if select_mode in ['move', 'scale', 'rotate'] and mb[0] == 0: # the handle was let go off the canvas
+        let_go_handle()
     if tool != selection:
+        if selected: # put down a selection that was left on the canvas
+            place_selection()
         selection_pts = []
         selected = False
 
@@ -876,5 +1151,31 @@ while running:
     display_text = False
     
     display.flip()
-    
+    if recorder != None:
+        recorder.capture(recorded_canvas())
+    frames += 1
+    if stats and len(events) > 0 and events[0].type != NOEVENT:
+        latencies.append(1000*(perf_counter() - inputTime))
+    # keep drawing while the mouse is pressed, until the full quality selection can be shown, or until the
+    # timelapse recorder has recorded the last change
+    redraw = mb[0] == 1 or moving != None or (select_job != None and not select_job.get('shown'))
+    redraw = redraw or (recorder != None and recorder.pending)
+    stepTime = min(stepTime + clock.tick(FPS), 10*stepLength) # at most 60 frames per second
+
+if stats:
+    totalTime = perf_counter() - startTime
+    print('%i frames in %.1f s, asleep for %.0f%% of the time' % (frames, totalTime, 100*waitTime/max(totalTime, 1e-9)))
+    print('CPU use: %.1f%% while asleep, %.1f%% overall' % (100*waitCpu/max(waitTime, 1e-9), 100*(process_time()-startCpu)/max(totalTime, 1e-9)))
+    if len(latencies) > 0:
+        latencies.sort()
+        print('input to pixels: %.1f ms on average, %.1f ms at worst (plus up to %.1f ms waiting for the next frame while drawing)'
+              % (sum(latencies)/len(latencies), latencies[-1], 1000/FPS))
+
+if recorder != None:
+    recorder.close(recorded_canvas())
+    if stats:
+        print(recorder.report())
+
+if collab != None:
+    collab.close()
 quit()
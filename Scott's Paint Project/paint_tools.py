@@ -0,0 +1,363 @@
+# paint_tools.py
+# Drawing functions for the tools in paint_project.py. Each function is given the surface to draw on, so the
+# same tools can be used on the screen while the user is drawing, or on a separate canvas surface (for example
+# when another program replays a list of operations). An operation is a small dictionary that describes one
+# edit to the canvas, such as {'op': 'pencil', 'colour': [0, 0, 0], 'points': [[10, 10], [20, 15]]}. The
+# coordinates in an operation are relative to the top left corner of the canvas.
+
+###########################################################################
+
+import os
+from pygame import *
+from random import *
+from math import *
+from text_engine import draw_text, defaultFamily, defaultSize
+try:
+    import numpy # for the smudge tool (pygame.surfarray needs it too)
+except ImportError:
+    numpy = None
+
+###########################################################################
+
+folder = os.path.dirname(os.path.abspath(__file__)) # folder with this file
+imageFolder = os.path.join(folder, 'Images') # folder with the images for the stamps (the name is case-sensitive on Linux)
+
+canvasSize = (750, 550) # size of the canvas
+WHITE = (255, 255, 255)
+
+# tools that draw along the path of the mouse while the mouse is pressed
+stroke_tools = ['pencil', 'eraser', 'brush', 'spray', 'glitter', 'marker']
+# tools that change the canvas around each position of the mouse while the mouse is pressed
+point_tools = ['blur', 'pixelate']
+# tools that are dragged from a starting point to the mouse
+shape_tools = ['line', 'rectangle', 'rectangle_filled', 'oval', 'oval_filled']
+
+# file name and size of each stamp -- stamps are centred at the mouse
+stamp_files = {'earth': ('earth.png', (90, 90)),
+               'moon': ('moon.png', (60, 60)),
+               'sun': ('sun.png', (150, 150)),
+               'stars': ('stars.png', (100, 100)),
+               'astronaut': ('astronaut.png', (90, 130)),
+               'shuttle': ('shuttle.png', (160, 80)),
+               'comet': ('comet.png', (100, 100)),
+               'asteroids': ('asteroids.png', (50, 50)),
+               'galaxy': ('galaxy.png', (120, 120)),
+               'satellite': ('satellite.png', (100, 60))}
+
+###########################################################################
+
+# functions for tools
+def line_points(oldx, oldy, mx, my): # list of points between (oldx, oldy) and (mx, my)
+    ans = []
+    dist = max(abs(mx-oldx), abs(my-oldy))
+    if dist == 0:
+        ans.append((mx, my))
+    for i in range(dist): # use similar triangles to find integer coordinates
+        newx = floor(oldx+i*(mx-oldx)/dist) # (rounded down, so a stroke left or above the canvas is the same shape)
+        newy = floor(oldy+i*(my-oldy)/dist)
+        ans.append((newx, newy))
+    return ans
+
+def stroke_dabs(points): # every point a stroke operation paints at, for the points the mouse moved through
+    dabs = []
+    for k in range(max(len(points)-1, 1)):
+        oldx, oldy = points[k]
+        mx, my = points[min(k+1, len(points)-1)]
+        dabs += line_points(oldx, oldy, mx, my)
+    return dabs
+
+def spray_paint(mx, my, radius, colour, screen, randint = randint): # spray paint effect for a given point
+    for i in range(radius):
+        x = randint(0-radius, radius)
+        y = randint(0-radius, radius)
+        if hypot(x, y) <= radius: # make sure pixel is in the circle
+            screen.set_at((mx+x, my+y), colour)
+
+def glitter_pt(mx, my, radius, colour, screen, randint = randint): # glitter effect for a given point
+    x = randint(0-radius, radius)
+    y = randint(0-radius, radius)
+    r = randint(1, 3)
+    if hypot(x, y)+r <= radius:
+        draw.circle(screen, colour, (mx+x, my+y), r)
+
+def bucket_fill(mx, my, oldColour, newColour, screen): # fill an area with the given colour
+    # i.e. checks if each pixel is the original colour; if so, fills it in and checks its four adjacent pixels
+    if oldColour != newColour:
+        points = {(mx, my)}
+        checked = set()
+        while len(points) > 0:
+            point = points.pop()
+            if point not in checked:
+                try:
+                    if screen.get_at(point) == oldColour:
+                        screen.set_at(point, newColour)
+                        x, y = point
+                        points.add((x-1, y))
+                        points.add((x+1, y))
+                        points.add((x, y-1))
+                        points.add((x, y+1))
+                except:
+                    pass
+                checked.add(point)
+
+def blur_circ(x, y, canvasRect, screen): # blur a circle with radius 20 around a point
+    # i.e. sets each point in the circle as the average colour of its adjacent pixels
+    cornerX, cornerY = x-20, y-20 # top left corner of the circle's circumscribed square
+    blurSurf = screen.subsurface(Rect(cornerX, cornerY, 40, 40)).copy()
+    blurSurf.set_colorkey((0, 1, 1, 0)) # for pixels not in the circle
+    for i in range(41):
+        for j in range(41):
+            if hypot(i-20, j-20) <= 20: # (i,j) on blurSurf corresponds to (cornerX+i,cornerY+j) on screen
+                # find the r, g, and b values of the pixel's adjacent points, then take their averages
+                xs = [k+cornerX for k in (i-1, i+1, i, i)]
+                ys = [k+cornerY for k in (j, j, j-1, j+1)]
+                r,g,b = [],[],[]
+                for k in range(4):
+                    if canvasRect.collidepoint(xs[k], ys[k]):
+                        colour = screen.get_at((xs[k], ys[k]))
+                        r.append(colour.r)
+                        g.append(colour.g)
+                        b.append(colour.b)
+                if len(r) > 0: # r, g, and b have the same number of elements
+                    avgR = sum(r)//len(r)
+                    avgG = sum(g)//len(g)
+                    avgB = sum(b)//len(b)
+                    blurSurf.set_at((i, j), (avgR ,avgG, avgB))
+            else:
+                blurSurf.set_at((i, j), (0, 1, 1, 0))
+    screen.blit(blurSurf, (cornerX, cornerY))
+
+smudgeWeights = {} # radius: how strongly each pixel of the smudge brush is blended (1 in the middle, 0 at the edge)
+
+def smudge(oldx, oldy, mx, my, buffer, canvasRect, screen, radius = 60, strength = 0.7):
+    # smudge the canvas along the stroke from (oldx, oldy) to (mx, my) -- returns the colours the brush is carrying
+    # i.e. buffer holds the colours under the brush. At each step along the stroke they are blended into the
+    # canvas, and the blended colours are carried on to the next step. numpy does this for every pixel in the
+    # brush's square at once, so only the steps are done one at a time.
+    if numpy == None:
+        return None
+    if radius not in smudgeWeights:
+        x, y = numpy.mgrid[-radius:radius, -radius:radius] + 0.5
+        smudgeWeights[radius] = numpy.clip(1 - numpy.hypot(x, y)/radius, 0, 1)[:, :, None].astype(numpy.float32)
+    weights = smudgeWeights[radius] * strength
+    pixels = surfarray.pixels3d(screen) # indexed [x, y], and changes the surface directly
+    if buffer is None: # pick up the colours at the start of the stroke
+        buffer = numpy.full((2*radius, 2*radius, 3), 255, numpy.float32)
+        box = Rect(oldx-radius, oldy-radius, 2*radius, 2*radius).clip(canvasRect)
+        bx, by = box.x-oldx+radius, box.y-oldy+radius # where the box is in the brush
+        buffer[bx:bx+box.w, by:by+box.h] = pixels[box.left:box.right, box.top:box.bottom]
+    dist = max(abs(mx-oldx), abs(my-oldy))
+    steps = 0 if dist == 0 else max(round(dist / (radius/4)), 1) # a step every quarter of the radius
+    for i in range(1, steps+1):
+        x, y = oldx + (mx-oldx)*i//steps, oldy + (my-oldy)*i//steps
+        box = Rect(x-radius, y-radius, 2*radius, 2*radius).clip(canvasRect) # brush's square, on the canvas
+        if box.w == 0 or box.h == 0:
+            continue
+        bx, by = box.x-x+radius, box.y-y+radius
+        area = pixels[box.left:box.right, box.top:box.bottom]
+        carried = buffer[bx:bx+box.w, by:by+box.h]
+        blended = area + (carried - area) * weights[bx:bx+box.w, by:by+box.h]
+        area[...] = blended + 0.5 # rounded
+        carried[...] = blended
+    return buffer
+
+def pixel(x, y, canvasRect, screen): # pixelate a 5 x 5 square around a given point
+    # i.e. fills a 5 x 5 square with the average colour of its pixels
+    x, y = x - x%5, y - y%5 # so the squares line up
+    # the following algorithm for the average rgb value is similar to the one used in the blur function
+    r, g, b = [], [], []
+    for i in range(x, x+5):
+        for j in range(y, y+5):
+            if canvasRect.collidepoint(i, j):
+                colour = screen.get_at((i, j))
+                r.append(colour.r)
+                g.append(colour.g)
+                b.append(colour.b)
+    if len(r) > 0: # r, g, and b have the same number of elements
+        avgR = sum(r)//len(r)
+        avgG = sum(g)//len(g)
+        avgB = sum(b)//len(b)
+        draw.rect(screen, (avgR, avgG, avgB), (x, y, 5, 5))
+
+def cutout(selection_pts, screen): # cut out polygon (for selection tool)
+    xs, ys = zip(*selection_pts)
+    minX, maxX = min(xs), max(xs)
+    minY, maxY = min(ys), max(ys)
+    new_pts = [(i-minX, j-minY) for (i, j) in selection_pts] # "shift" points to fit on a smaller surface
+    selectRect = Rect((minX, minY, maxX-minX+1, maxY-minY+1))
+    select_surface = screen.subsurface(selectRect).copy() # smallest surface that contains the whole polygon
+    select_surface.set_colorkey((0, 1, 0, 0))
+    shape_surface = Surface((maxX-minX+1, maxY-minY+1))
+    shape_surface.fill((0, 1, 0, 0)) # second surface filled with the first surface's colorkey
+    shape_surface.set_colorkey((0, 1, 1, 0))
+    draw.polygon(shape_surface, (0, 1, 1, 0), new_pts) # transparent polygon drawn on second surface
+    select_surface.blit(shape_surface, (0, 0)) # when the 2nd surface is blitted over the 1st, the selected
+                                             # polygon remains visible while the rest becomes transparent
+    return select_surface
+
+def scale_limits(size): # smallest and largest scale of a cut out polygon of this size (for selection tool)
+    # i.e. scaled up, it is never much bigger than the canvas
+    return 0.1, 1500/max(size)
+
+def transform_selection(select_surface, angle, scale): # cut out polygon rotated and scaled (for selection tool)
+    # i.e. copies it onto a see-through surface first, so the smooth resampling doesn't blend in the colorkey
+    if angle % 360 == 0 and scale == 1:
+        return select_surface
+    w, h = select_surface.get_size()
+    alpha_surface = Surface((w, h), SRCALPHA)
+    alpha_surface.fill((0, 0, 0, 0))
+    alpha_surface.blit(select_surface, (0, 0))
+    if angle % 360 == 0:
+        return transform.smoothscale(alpha_surface, (max(round(w*scale), 1), max(round(h*scale), 1)))
+    return transform.rotozoom(alpha_surface, angle, scale)
+
+def draw_shape(shape, startx, starty, mx, my, colour, screen): # line, rectangle or oval dragged from (startx, starty)
+    if shape == 'line':
+        for i in line_points(startx, starty, mx, my):
+            draw.circle(screen, colour, i, 2)
+
+    elif shape == 'rectangle':
+        minx, miny = min(startx, mx), min(starty, my)
+        posw, posh = max(abs(mx-startx), 1), max(abs(my-starty), 1) # positive width and height of rectangle
+        rectangle_surface = Surface((posw, posh)) # surface for rectangle tool (unfilled)
+        rectangle_surface.fill(colour)
+        rectangle_surface.set_colorkey((1, 1, 1, 0))
+        if posw >= 7 and posh >= 7:
+            draw.rect(rectangle_surface, (1, 1, 1, 0), (3, 3, posw-6, posh-6))
+        screen.blit(rectangle_surface, (minx, miny))
+
+    elif shape == 'rectangle_filled':
+        drawRect = Rect(startx, starty, mx-startx, my-starty)
+        drawRect.normalize()
+        draw.rect(screen, colour, drawRect)
+
+    elif shape == 'oval':
+        minx, miny = min(startx, mx), min(starty, my)
+        radx, rady = max(abs(mx-startx), 1), max(abs(my-starty), 1) # dimensions of ellipse
+        ellipse_surface = Surface((radx, rady)) # surface for oval tool (unfilled)
+        ellipse_surface.set_colorkey((1, 1, 1, 0))
+        ellipse_surface.fill((1, 1, 1, 0))
+        draw.ellipse(ellipse_surface, colour, (0, 0, radx, rady))
+        if radx >= 10 and rady >= 10:
+            draw.ellipse(ellipse_surface, (1, 1, 1, 0), (3, 3, radx-6, rady-6))
+        screen.blit(ellipse_surface, (minx, miny))
+
+    elif shape == 'oval_filled':
+        radx, rady = max(abs(mx-startx), 1), max(abs(my-starty), 1) # dimensions of ellipse
+        draw.ellipse(screen, colour, (min(mx, startx), min(my, starty), radx, rady))
+
+def draw_polygon(points, colour, filled, screen): # closed polygon (for polygon and filled polygon tools)
+    if filled and len(points) > 2: # filled polygon requires at least 3 points
+        draw.polygon(screen, colour, points)
+    elif len(points) > 1: # regular polygon requires at least 2 points
+        draw.polygon(screen, colour, points, 3)
+    else:
+        draw.circle(screen, colour, points[0], 2)
+
+def load_stamps(): # dictionary of stamp surfaces, at the size they are drawn on the canvas
+    stamps = {}
+    for name in stamp_files:
+        fileName, size = stamp_files[name]
+        stamps[name] = transform.scale(image.load(os.path.join(imageFolder, fileName)), size)
+    return stamps
+
+###########################################################################
+
+# operations
+marker_cover = Surface((42, 42)) # surface for marker operations
+marker_cover.set_alpha(5)
+marker_cover.set_colorkey((0, 1, 1, 0))
+
+def apply_op(op, canvas, stamps): # apply an operation to a canvas surface
+    # i.e. does the same thing as the matching tool in paint_project.py, with canvas coordinates
+    kind = op['op']
+    colour = tuple(op.get('colour', (0, 0, 0)))
+    canvasRect = canvas.get_rect()
+
+    if kind in stroke_tools:
+        randint = Random(op.get('seed', 0)).randint # spray and glitter look the same on every canvas
+        points = [tuple(i) for i in op['points']]
+        if kind == 'marker':
+            marker_cover.fill((0, 1, 1, 0))
+            draw.circle(marker_cover, colour, (21, 21), 20)
+        for i in stroke_dabs(points):
+            if kind == 'pencil':
+                draw.circle(canvas, colour, i, 2)
+            elif kind == 'eraser':
+                draw.circle(canvas, WHITE, i, 20)
+            elif kind == 'brush':
+                draw.circle(canvas, colour, i, 20)
+            elif kind == 'spray':
+                spray_paint(i[0], i[1], 20, colour, canvas, randint)
+            elif kind == 'glitter':
+                glitter_pt(i[0], i[1], 20, colour, canvas, randint)
+            elif kind == 'marker':
+                canvas.blit(marker_cover, (i[0]-21, i[1]-21))
+
+    elif kind in point_tools:
+        for mx, my in op['points']:
+            if kind == 'blur':
+                if canvasRect.contains(Rect(mx-20, my-20, 40, 40)):
+                    blur_circ(mx, my, canvasRect, canvas)
+                elif canvasRect.collidepoint(mx, my): # the blur needs a 40 x 40 square around the point
+                    padded = Surface((canvasRect.w+40, canvasRect.h+40))
+                    padded.blit(canvas, (20, 20))
+                    blur_circ(mx+20, my+20, canvasRect.move(20, 20), padded)
+                    canvas.blit(padded, (0, 0), canvasRect.move(20, 20))
+            else:
+                for i in range(mx-10, mx+11, 5):
+                    for j in range(my-10, my+11, 5):
+                        pixel(i, j, canvasRect, canvas)
+
+    elif kind == 'smudge':
+        points = [tuple(i) for i in op['points']]
+        buffer = None
+        for k in range(len(points)-1):
+            buffer = smudge(*points[k], *points[k+1], buffer, canvasRect, canvas)
+
+    elif kind in shape_tools:
+        startx, starty = op['start']
+        mx, my = op['end']
+        draw_shape(kind, startx, starty, mx, my, colour, canvas)
+
+    elif kind == 'ink':
+        points = [tuple(i) for i in op['points']]
+        xs, ys = zip(*points)
+        left, top = min(xs)-21, min(ys)-21 # top left corner of the area the stroke covers
+        ink_cover = Surface((max(xs)-left+22, max(ys)-top+22)) # the whole stroke is drawn at once, like the ink tool on release
+        ink_cover.set_alpha(100)
+        ink_cover.set_colorkey((0, 1, 1, 0))
+        ink_cover.fill((0, 1, 1, 0))
+        for i in stroke_dabs(points):
+            draw.circle(ink_cover, colour, (i[0]-left, i[1]-top), 20)
+        canvas.blit(ink_cover, (left, top))
+
+    elif kind in ['polygon', 'polygon_filled']:
+        draw_polygon([tuple(i) for i in op['points']], colour, kind == 'polygon_filled', canvas)
+
+    elif kind == 'bucket':
+        mx, my = op['point']
+        if canvasRect.collidepoint(mx, my):
+            bucket_fill(mx, my, canvas.get_at((mx, my)), colour, canvas)
+
+    elif kind == 'text':
+        mx, my = op['point']
+        draw_text(op['text'], op.get('font', defaultFamily), op.get('size', defaultSize), colour, mx, my, canvas)
+
+    elif kind == 'selection':
+        selection_pts = [tuple(i) for i in op['points']]
+        select_surface = cutout(selection_pts, canvas)
+        draw.polygon(canvas, WHITE, selection_pts)
+        select_surface = transform_selection(select_surface, op.get('angle', 0), op.get('scale', 1))
+        mx, my = op['point']
+        w, h = select_surface.get_size()
+        canvas.blit(select_surface, (mx-w//2, my-h//2))
+
+    elif kind == 'stamp':
+        mx, my = op['point']
+        stamp = stamps[op['name']]
+        w, h = stamp.get_size()
+        canvas.blit(stamp, (mx-w//2, my-h//2))
+
+    elif kind == 'clear':
+        canvas.fill(WHITE)
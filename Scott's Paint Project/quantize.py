@@ -0,0 +1,241 @@
+# quantize.py
+# Palette reduction for pixel art. A canvas is reduced to a small palette of colours, either chosen for the
+# canvas by median cut (optionally improved with a few rounds of k-means), or a fixed palette sampled from the
+# colour palette image (Images/palette.jpg). The canvas can be dithered while it is reduced, with an ordered
+# (Bayer) pattern or with Floyd-Steinberg error diffusion, and the result is an 8-bit surface with a palette,
+# which image.save writes as an indexed image. Everything works on whole numpy arrays at once -- even
+# Floyd-Steinberg, which handles a diagonal line of pixels at a time, since the pixels on it don't depend on
+# each other.
+#
+# python quantize.py canvas.png pixel_art.png [--colours 16] [--palette] [--dither floyd] [--kmeans 4]
+# python quantize.py bench [canvas.png]          time every step for several palette sizes
+
+###########################################################################
+
+from pygame import *
+from paint_tools import *
+import sys
+import time # after pygame, which has its own time module
+import argparse
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+###########################################################################
+
+dithers = [None, 'ordered', 'floyd'] # ways to dither a canvas
+tableBits = 5 # bits of each colour channel used to look up the nearest palette colour while dithering
+
+# 8 x 8 Bayer matrix, as thresholds from -0.5 to 0.5
+bayer = [[0, 32, 8, 40, 2, 34, 10, 42],
+         [48, 16, 56, 24, 50, 18, 58, 26],
+         [12, 44, 4, 36, 14, 46, 6, 38],
+         [60, 28, 52, 20, 62, 30, 54, 22],
+         [3, 35, 11, 43, 1, 33, 9, 41],
+         [51, 19, 59, 27, 49, 17, 57, 25],
+         [15, 47, 7, 39, 13, 45, 5, 37],
+         [63, 31, 55, 23, 61, 29, 53, 21]]
+
+fixed_palettes = {} # number of colours: palette sampled from palette.jpg
+
+def need_numpy():
+    if numpy == None:
+        raise ValueError('reducing colours needs numpy')
+
+def canvas_pixels(canvas): # height x width x 3 array of the canvas's colours
+    w, h = canvas.get_size()
+    return numpy.frombuffer(image.tostring(canvas, 'RGB'), numpy.uint8).reshape(h, w, 3)
+
+def colour_counts(pixels): # each different colour, how many pixels have it, and which colour each pixel has
+    packed = pixels.reshape(-1, 3).astype(numpy.uint32) @ numpy.array([1 << 16, 1 << 8, 1], numpy.uint32)
+    packed, inverse, counts = numpy.unique(packed, return_inverse = True, return_counts = True)
+    colours = numpy.stack([packed >> 16, (packed >> 8) & 255, packed & 255], 1).astype(numpy.float32)
+    return colours, counts.astype(numpy.float32), inverse.reshape(pixels.shape[:2])
+
+###########################################################################
+
+def box_error(colours, counts): # how far the colours in a box are from their average, in total
+    mean = counts @ colours / counts.sum()
+    return float(counts @ ((colours - mean)**2).sum(1))
+
+def median_cut(colours, counts, n): # palette of at most n colours (float array) for colours with the given counts
+    # i.e. start with one box around every colour, then keep splitting the box with the largest error in two, at
+    # the median pixel along the channel it is most spread out in, until there are n boxes
+    boxes = [numpy.arange(len(colours))]
+    errors = [box_error(colours, counts)]
+    while len(boxes) < n:
+        i = int(numpy.argmax(errors))
+        if errors[i] == 0: # every box has only one colour left
+            break
+        box = boxes.pop(i)
+        errors.pop(i)
+        boxColours, boxCounts = colours[box], counts[box]
+        channel = int(numpy.argmax(boxCounts @ (boxColours - boxCounts @ boxColours / boxCounts.sum())**2))
+        order = numpy.argsort(boxColours[:, channel], kind = 'stable')
+        total = numpy.cumsum(boxCounts[order])
+        cut = min(max(int(numpy.searchsorted(total, total[-1]/2)) + 1, 1), len(box)-1)
+        for half in [box[order[:cut]], box[order[cut:]]]:
+            boxes.append(half)
+            errors.append(box_error(colours[half], counts[half]))
+    return numpy.array([counts[box] @ colours[box] / counts[box].sum() for box in boxes], numpy.float32)
+
+def nearest(colours, palette): # index of the nearest palette colour to each colour
+    # |c - p|^2 = |c|^2 - 2 c.p + |p|^2, and |c|^2 is the same for every p, so only the rest is compared
+    indices = numpy.empty(len(colours), numpy.int64)
+    lengths = (palette**2).sum(1)
+    for start in range(0, len(colours), 65536): # in pieces, so the table of distances stays small
+        part = colours[start:start+65536].astype(numpy.float32)
+        indices[start:start+65536] = numpy.argmin(lengths - 2*part @ palette.T, 1)
+    return indices
+
+def kmeans(colours, counts, palette, rounds = 4): # move the palette colours to the average of their pixels
+    for i in range(rounds):
+        labels = nearest(colours, palette)
+        sizes = numpy.bincount(labels, counts, len(palette))
+        sums = numpy.stack([numpy.bincount(labels, counts*colours[:, j], len(palette)) for j in range(3)], 1)
+        used = sizes > 0 # palette colours that no pixel is nearest to stay where they are
+        palette = palette.copy()
+        palette[used] = sums[used] / sizes[used, None]
+    return palette
+
+def fixed_palette(n): # n colours sampled from the colour palette image
+    if n not in fixed_palettes:
+        pixels = canvas_pixels(image.load(os.path.join(imageFolder, 'palette.jpg')))
+        colours, counts, inverse = colour_counts(pixels)
+        fixed_palettes[n] = median_cut(colours, counts, n)
+    return fixed_palettes[n]
+
+###########################################################################
+
+def lookup_table(palette): # index of the nearest palette colour for every colour, using tableBits of each channel
+    levels = 1 << tableBits
+    step = 256 // levels
+    channel = numpy.arange(levels, dtype = numpy.float32) * step + (step-1)/2 # middle of each level
+    r, g, b = numpy.meshgrid(channel, channel, channel, indexing = 'ij')
+    return nearest(numpy.stack([r.ravel(), g.ravel(), b.ravel()], 1), palette).astype(numpy.uint8)
+
+def look_up(table, colours): # nearest palette colours from a lookup table, for an array of colours
+    c = numpy.clip(colours, 0, 255).astype(numpy.int32) >> (8 - tableBits)
+    return table[(c[..., 0] << 2*tableBits) | (c[..., 1] << tableBits) | c[..., 2]]
+
+def ordered_dither(pixels, palette, table): # indices, with the Bayer matrix added to the colours before looking up
+    h, w = pixels.shape[:2]
+    thresholds = (numpy.array(bayer, numpy.float32) + 0.5) / 64 - 0.5
+    thresholds = numpy.tile(thresholds, ((h+7)//8, (w+7)//8))[:h, :w]
+    strength = 255 / len(palette)**(1/3) # about the distance between two palette colours
+    return look_up(table, pixels + strength*thresholds[:, :, None])
+
+def floyd_steinberg(pixels, palette, table): # indices, with each pixel's error spread to the pixels after it
+    # Pixel (x, y) gets error from (x-1, y), (x-1, y-1), (x, y-1), and (x+1, y-1), so every pixel on the line
+    # x + 2y = t only depends on pixels with smaller t. The pixels are moved into rows of the same t (with
+    # padding where a line goes off the canvas), and each row is done at once.
+    h, w = pixels.shape[:2]
+    steps = w + 2*(h-1)
+    ys, xs = numpy.mgrid[0:h, 0:w]
+    lines = numpy.zeros((steps+3, h, 3), numpy.float32) # row t has the pixels on line t (padded to h pixels)
+    lines[xs + 2*ys, ys] = pixels
+    inside = numpy.zeros((steps+3, h, 1), numpy.float32)
+    inside[xs + 2*ys, ys] = 1 # 1 for pixels of the canvas, 0 for padding
+    indices = numpy.zeros((steps, h), numpy.uint8)
+    for t in range(steps):
+        line = numpy.clip(lines[t], 0, 255) # so colours the palette can't reach don't build up error forever
+        indices[t] = look_up(table, line)
+        error = (line - palette[indices[t]]) * inside[t]
+        lines[t+1] += error * (7/16) # (x+1, y)
+        lines[t+1, 1:] += error[:-1] * (3/16) # (x-1, y+1)
+        lines[t+2, 1:] += error[:-1] * (5/16) # (x, y+1)
+        lines[t+3, 1:] += error[:-1] * (1/16) # (x+1, y+1)
+    return indices[xs + 2*ys, ys]
+
+###########################################################################
+
+def quantize(canvas, colours = 16, fixed = False, dither = None, rounds = 0): # 8-bit copy of the canvas
+    # colours -- size of the palette; fixed -- use colours from palette.jpg instead of choosing them for the
+    # canvas; dither -- None, 'ordered', or 'floyd'; rounds -- rounds of k-means after median cut
+    need_numpy()
+    pixels = canvas_pixels(canvas)
+    if fixed:
+        palette = fixed_palette(colours)
+    else:
+        counts = colour_counts(pixels)
+        palette = median_cut(counts[0], counts[1], colours)
+        if rounds > 0:
+            palette = kmeans(counts[0], counts[1], palette, rounds)
+    palette = numpy.clip(numpy.round(palette), 0, 255)
+
+    if dither == None: # only the different colours need to be looked up
+        if fixed:
+            counts = colour_counts(pixels)
+        indices = nearest(counts[0], palette)[counts[2]]
+    elif dither == 'ordered':
+        indices = ordered_dither(pixels, palette, lookup_table(palette))
+    elif dither == 'floyd':
+        indices = floyd_steinberg(pixels.astype(numpy.float32), palette, lookup_table(palette))
+    else:
+        raise ValueError('unknown dithering %r' % dither)
+
+    result = Surface(canvas.get_size(), 0, 8)
+    colourList = [tuple(int(j) for j in i) for i in palette]
+    result.set_palette(colourList + colourList[-1:]*(256-len(colourList)))
+    surfarray.blit_array(result, indices.T.astype(numpy.uint8)) # surfarray uses x, y order
+    return result
+
+def save_indexed(canvas, fileName, colours = 16, fixed = False, dither = None, rounds = 0):
+    image.save(quantize(canvas, colours, fixed, dither, rounds), fileName)
+
+###########################################################################
+
+def bench(fileName = None): # time each step of quantizing a canvas, for several palette sizes
+    need_numpy()
+    if fileName:
+        canvas = image.load(fileName)
+    else: # the colour palette stretched over the canvas has many colours, like a canvas with a lot of blur
+        canvas = Surface(canvasSize)
+        canvas.blit(transform.smoothscale(image.load(os.path.join(imageFolder, 'palette.jpg')), canvasSize), (0, 0))
+    pixels = canvas_pixels(canvas)
+    w, h = canvas.get_size()
+    start = time.perf_counter()
+    colours, counts, inverse = colour_counts(pixels)
+    print('%i x %i canvas, %i different colours (counted in %.0f ms)' % (w, h, len(colours), 1000*(time.perf_counter()-start)))
+    print('colours  median cut  k-means x4  no dither  ordered  Floyd-Steinberg  fixed palette (ms)')
+    for n in [4, 16, 64, 256]:
+        times = []
+        start = time.perf_counter()
+        palette = median_cut(colours, counts, n)
+        times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        kmeans(colours, counts, palette)
+        times.append(time.perf_counter() - start)
+        for dither in dithers:
+            start = time.perf_counter()
+            quantize(canvas, n, dither = dither)
+            times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        quantize(canvas, n, fixed = True, dither = 'floyd')
+        times.append(time.perf_counter() - start)
+        print('%7i %11.0f %11.0f %10.0f %8.0f %16.0f %14.0f' % tuple([n] + [1000*i for i in times]))
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'bench':
+        parser = argparse.ArgumentParser(description = 'Time quantizing a canvas for several palette sizes.')
+        parser.add_argument('command')
+        parser.add_argument('canvas', nargs = '?', help = 'image to quantize (default: the background image)')
+        args = parser.parse_args()
+        bench(args.canvas)
+        return 0
+    parser = argparse.ArgumentParser(description = 'Reduce an image to a palette and save it as an 8-bit image.')
+    parser.add_argument('canvas', help = 'image to reduce')
+    parser.add_argument('output', help = 'PNG or BMP file for the 8-bit image')
+    parser.add_argument('--colours', type = int, default = 16, help = 'size of the palette, up to 256 (default: 16)')
+    parser.add_argument('--palette', action = 'store_true', help = 'use colours from Images/palette.jpg')
+    parser.add_argument('--dither', choices = ['ordered', 'floyd'], help = 'dithering (default: none)')
+    parser.add_argument('--kmeans', type = int, default = 0, help = 'rounds of k-means after median cut')
+    args = parser.parse_args()
+    start = time.perf_counter()
+    save_indexed(image.load(args.canvas), args.output, min(max(args.colours, 1), 256), args.palette, args.dither, args.kmeans)
+    print('saved %s in %.0f ms' % (args.output, 1000*(time.perf_counter()-start)))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
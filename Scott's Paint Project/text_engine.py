@@ -0,0 +1,154 @@
+# text_engine.py
+# Text for the text tool in paint_project.py and for text operations (see paint_tools.py). Each character is
+# drawn by the font once, onto an atlas surface that holds every character used so far in one font, size, and
+# colour. Text is laid out one character at a time, with a new line for each '\n', onto its own surface. When
+# the text changes, only the characters from the first one that changed onward are erased and drawn again, so
+# typing one more character only draws one character, however long the text is.
+
+###########################################################################
+
+from pygame import *
+
+###########################################################################
+
+# fonts the text tool can use (font name for font.SysFont, name shown to the user)
+font_families = [('trebuchetms', 'Trebuchet'),
+                 ('arial', 'Arial'),
+                 ('timesnewroman', 'Times'),
+                 ('couriernew', 'Courier'),
+                 ('comicsansms', 'Comic Sans')]
+text_sizes = list(range(10, 74, 2)) # font sizes the text tool can use
+
+defaultFamily = 'trebuchetms' # font of text operations that don't give one
+defaultSize = 20
+maxText = 1000 # most characters in one text (so a text operation is never too big to send)
+
+fonts = {} # (family, size): font
+atlases = {} # (family, size, colour): GlyphAtlas
+CLEAR = (0, 0, 0, 0) # see-through pixel
+
+def get_font(family = defaultFamily, size = defaultSize): # bold font, loaded the first time it is needed
+    if (family, size) not in fonts:
+        if not font.get_init():
+            font.init()
+        fonts[(family, size)] = font.SysFont(family, size, bold = True)
+    return fonts[(family, size)]
+
+def get_atlas(family, size, colour): # atlas for a font, size, and colour, made the first time it is needed
+    colour = tuple(colour)[:3]
+    if (family, size, colour) not in atlases:
+        atlases[(family, size, colour)] = GlyphAtlas(get_font(family, size), colour)
+    return atlases[(family, size, colour)]
+
+def text_size(text, family = defaultFamily, size = defaultSize): # size of laid out text, without drawing it
+    textFont = get_font(family, size)
+    lines = text.split('\n')
+    w = max(sum(textFont.size(i)[0] for i in line) for line in lines)
+    return w, (len(lines)-1)*textFont.get_linesize() + textFont.get_height()
+
+###########################################################################
+
+class GlyphAtlas: # every character used so far in one font and colour, drawn side by side on one surface
+    def __init__(self, textFont, colour):
+        self.font = textFont
+        self.colour = colour
+        self.height = textFont.get_height()
+        self.lineHeight = textFont.get_linesize()
+        self.sheet = Surface((512, self.height), SRCALPHA)
+        self.sheet.fill(CLEAR)
+        self.glyphs = {} # character: Rect of the character on the sheet
+        self.advances = {} # character: how far the next character is to the right
+        self.x, self.y = 0, 0 # where the next character goes on the sheet
+
+    def glyph(self, char): # Rect of a character on the sheet -- it is drawn the first time it is used
+        if char not in self.glyphs:
+            pic = self.font.render(char, True, self.colour)
+            w, h = pic.get_size()
+            if self.x + w > self.sheet.get_width(): # start a new row
+                self.x, self.y = 0, self.y + self.height
+            if self.y + h > self.sheet.get_height(): # make the sheet taller
+                sheet = Surface((max(self.sheet.get_width(), w), 2*self.sheet.get_height()), SRCALPHA)
+                sheet.fill(CLEAR)
+                sheet.blit(self.sheet, (0, 0), special_flags = BLEND_RGBA_MAX)
+                self.sheet = sheet
+            self.sheet.blit(pic, (self.x, self.y), special_flags = BLEND_RGBA_MAX) # copies the pixels as they are
+            self.glyphs[char] = Rect(self.x, self.y, w, h)
+            self.advances[char] = self.font.size(char)[0]
+            self.x += w
+        return self.glyphs[char]
+
+class TextLayout: # text laid out in lines and drawn on its own surface
+    def __init__(self):
+        self.atlas = None
+        self.text = ''
+        self.positions = [] # top left corner of each character
+        self.lineWidths = [0] # width of each line
+        self.surface = Surface((256, 64), SRCALPHA)
+        self.surface.fill(CLEAR)
+        self.size = (0, 0) # size of the text on the surface
+
+    def update(self, text, atlas): # change the text -- returns the number of characters that were drawn
+        if atlas is not self.atlas: # new font, size, or colour -- draw everything again
+            self.atlas = atlas
+            self.text, self.positions, self.lineWidths = '', [], [0]
+            self.surface.fill(CLEAR)
+        if text.startswith(self.text): # typed at the end
+            k = len(self.text) # index of the first character that changed
+        elif self.text.startswith(text): # deleted from the end
+            k = len(text)
+        else:
+            k = 0
+            while k < min(len(text), len(self.text)) and text[k] == self.text[k]:
+                k += 1
+
+        # erase the characters after it
+        for i in range(k, len(self.text)):
+            if self.text[i] != '\n':
+                self.surface.fill(CLEAR, Rect(self.positions[i], atlas.glyph(self.text[i]).size))
+        del self.positions[k:]
+        if k > 0 and text[k-1] != '\n': # the character before might reach into the part that was erased
+            self.surface.blit(atlas.sheet, self.positions[k-1], atlas.glyph(text[k-1]), special_flags = BLEND_RGBA_MAX)
+        if k > 0 and self.text[k-1] == '\n':
+            x, y = 0, self.positions[k-1][1] + atlas.lineHeight
+        elif k > 0:
+            x, y = self.positions[k-1][0] + atlas.advances[self.text[k-1]], self.positions[k-1][1]
+        else:
+            x, y = 0, 0
+        del self.lineWidths[self.text.count('\n', 0, k)+1:]
+        self.lineWidths[-1] = x
+
+        # lay out and draw the characters from there on
+        for i in range(k, len(text)):
+            char = text[i]
+            self.positions.append((x, y))
+            if char == '\n':
+                x, y = 0, y + atlas.lineHeight
+                self.lineWidths.append(0)
+                continue
+            area = atlas.glyph(char)
+            self.fit(x + area.w, y + area.h)
+            self.surface.blit(atlas.sheet, (x, y), area, special_flags = BLEND_RGBA_MAX)
+            x += atlas.advances[char]
+            self.lineWidths[-1] = x
+        self.text = text
+        self.size = (max(self.lineWidths), y + atlas.height)
+        return len(text) - k
+
+    def fit(self, w, h): # make the surface at least w x h
+        oldW, oldH = self.surface.get_size()
+        if w > oldW or h > oldH:
+            surface = Surface((max(w, 2*oldW), max(h, 2*oldH)), SRCALPHA)
+            surface.fill(CLEAR)
+            surface.blit(self.surface, (0, 0), special_flags = BLEND_RGBA_MAX)
+            self.surface = surface
+
+    def draw(self, x, y, screen): # draw the text centred at (x, y) -- returns the Rect it covers
+        w, h = self.size
+        rect = Rect(x-w//2, y-h//2, w, h)
+        screen.blit(self.surface, rect.topleft, (0, 0, w, h))
+        return rect
+
+def draw_text(text, family, size, colour, x, y, screen): # draw text centred at (x, y) -- returns the Rect it covers
+    layout = TextLayout()
+    layout.update(text, get_atlas(family, size, colour))
+    return layout.draw(x, y, screen)
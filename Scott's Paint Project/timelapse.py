@@ -0,0 +1,312 @@
+# timelapse.py
+# Timelapse recording for paint_project.py. Up to 30 times a second while the canvas is changing, the recorder
+# compares the canvas with the last copy it recorded and only keeps the tiles that are different. A worker thread
+# compresses the tiles and writes them to a stream file, so the paint program never waits for the disk. The
+# exporter reads the stream one record at a time, draws the tiles onto one canvas, and writes a frame to disk
+# whenever the video reaches the next frame, so only one canvas and one frame are ever kept in memory.
+#
+# python paint_project.py --record session.tl                          record a drawing session
+# python timelapse.py export session.tl frames [--size 375x275] [--speed 8] [--fps 30] [--gap 1]
+#                                                                      export as a folder of PNG images
+# python timelapse.py export session.tl session.y4m ...                export as an uncompressed Y4M video
+# python timelapse.py bench [--frames 600]                             measure recording with simulated strokes
+
+###########################################################################
+
+import os
+from pygame import *
+from random import *
+from paint_tools import *
+import sys
+import zlib
+import struct
+import threading
+import queue
+import time # after pygame, which has its own time module
+import argparse
+import tempfile
+try:
+    import numpy # for Y4M export
+except ImportError:
+    numpy = None
+
+###########################################################################
+
+tileSize = 50 # width and height of each tile of the canvas
+captureRate = 30 # most copies of the canvas recorded per second
+magic = b'PAINTTL1' # start of every stream file
+
+# a stream file is the magic bytes and the size of the canvas, followed by one record for each copy of the
+# canvas: the time since recording started and the number of tiles, then each tile's Rect, the length of its
+# compressed pixels, and the compressed pixels
+headerFormat = struct.Struct('<HH')
+recordFormat = struct.Struct('<dI')
+tileFormat = struct.Struct('<HHHHI')
+
+class TimelapseRecorder: # records the canvas of one drawing session to a stream file
+    def __init__(self, fileName, size = canvasSize):
+        self.size = size
+        self.snapshot = Surface(size) # copy of the canvas being recorded
+        self.last = None # pixels of the last copy that was recorded (every tile is recorded the first time)
+        self.startTime = time.perf_counter()
+        self.lastCapture = None # time of the last copy that was recorded
+        self.pending = False # whether a copy was skipped, so the canvas may have changed since the last one
+        self.captures, self.captureTime, self.worst = 0, 0, 0 # for the overhead of recording
+        self.tiles, self.bytes = 0, 0
+        self.file = open(fileName, 'wb')
+        self.file.write(magic + headerFormat.pack(*size))
+        self.queue = queue.Queue(4) # at most a few records wait for the writer (each can be the whole canvas)
+        self.writer = threading.Thread(target = self.write, daemon = True)
+        self.writer.start()
+
+    def changed_tiles(self, data): # list of (x, y, w, h, pixels) for the tiles that changed
+        # data is the pixels of the snapshot as they are stored, so comparing needs no conversion. In each row of
+        # tiles, every tile from the leftmost to the rightmost tile that changed is recorded, and only those
+        # tiles are converted to RGB.
+        w, h = self.size
+        row = w * self.snapshot.get_bytesize() # bytes in a row of pixels
+        columns = (w-1)//tileSize + 1
+        tiles = []
+        for y in range(0, h, tileSize):
+            th = min(tileSize, h-y)
+            if self.last == None:
+                left, right = 0, columns-1
+            elif data[y*row:(y+th)*row] == self.last[y*row:(y+th)*row]:
+                continue # nothing changed in this row of tiles
+            else:
+                left, right = columns, -1
+                for start in range(y*row, (y+th)*row, row):
+                    # only look for changes outside the tiles that will already be recorded
+                    if self.changed(data, start, 0, left-1):
+                        left = self.first_change(data, start, 0, left-1)
+                    if self.changed(data, start, right+1, columns-1):
+                        right = self.last_change(data, start, right+1, columns-1)
+            for x in range(left*tileSize, right*tileSize+1, tileSize):
+                tw = min(tileSize, w-x)
+                tiles.append((x, y, tw, th, image.tostring(self.snapshot.subsurface((x, y, tw, th)), 'RGB')))
+        return tiles
+
+    def changed(self, data, start, low, high): # whether tiles low to high changed, in the row of pixels at start
+        tileBytes = self.snapshot.get_bytesize() * tileSize
+        end = min(start + (high+1)*tileBytes, start + self.size[0]*self.snapshot.get_bytesize())
+        return low <= high and data[start+low*tileBytes:end] != self.last[start+low*tileBytes:end]
+
+    def first_change(self, data, start, low, high): # first of tiles low to high that changed (one of them did)
+        while low < high:
+            middle = (low+high) // 2
+            if self.changed(data, start, low, middle):
+                high = middle
+            else:
+                low = middle+1
+        return low
+
+    def last_change(self, data, start, low, high): # last of tiles low to high that changed (one of them did)
+        while low < high:
+            middle = (low+high+1) // 2
+            if self.changed(data, start, middle, high):
+                low = middle
+            else:
+                high = middle-1
+        return low
+
+    def capture(self, canvas, force = False, wait = False): # record the canvas, if it changed (at most captureRate
+        # times a second). i.e. if the writer is behind, the copy is skipped and the tiles that changed are recorded
+        # on a later frame, unless wait is True (the last copy, which must be recorded)
+        start = time.perf_counter()
+        if not force and self.lastCapture != None and start - self.lastCapture < 1/captureRate:
+            self.pending = True # too soon -- record it on a later frame
+            return
+        self.pending = False
+        self.lastCapture = start
+        self.snapshot.blit(canvas, (0, 0)) # its rows are next to each other, unlike a subsurface of the screen
+        data = self.snapshot.get_buffer().raw
+        if data != self.last:
+            tiles = self.changed_tiles(data)
+            try:
+                if wait:
+                    self.queue.put((start - self.startTime, tiles))
+                else:
+                    self.queue.put_nowait((start - self.startTime, tiles))
+            except queue.Full: # the writer is behind -- record these tiles (and any more changes) on a later frame
+                self.pending = True
+                return
+            self.last = data
+            self.tiles += len(tiles)
+        elapsed = time.perf_counter() - start
+        self.captures += 1
+        self.captureTime += elapsed
+        self.worst = max(self.worst, elapsed)
+
+    def write(self): # compress and write records (runs on its own thread)
+        while True:
+            record = self.queue.get()
+            if record == None:
+                break
+            t, tiles = record
+            chunks = [recordFormat.pack(t, len(tiles))]
+            for x, y, w, h, data in tiles:
+                data = zlib.compress(data)
+                chunks.append(tileFormat.pack(x, y, w, h, len(data)))
+                chunks.append(data)
+            chunk = b''.join(chunks)
+            self.file.write(chunk)
+            self.bytes += len(chunk)
+
+    def close(self, canvas): # record the last copy of the canvas and finish the file
+        self.capture(canvas, force = True, wait = True)
+        self.queue.put(None)
+        self.writer.join()
+        self.file.close()
+
+    def report(self): # how much recording cost, as text
+        return ('timelapse: %i copies recorded, %.2f ms on average, %.2f ms at worst, %i tiles, %.0f KB written'
+                % (self.captures, 1000*self.captureTime/max(self.captures, 1), 1000*self.worst, self.tiles, self.bytes/1024))
+
+###########################################################################
+
+def read_stream(fileName): # (time, tiles) for each record of a stream file, read one at a time
+    with open(fileName, 'rb') as f:
+        if f.read(len(magic)) != magic:
+            raise ValueError('%s is not a timelapse stream' % fileName)
+        yield headerFormat.unpack(f.read(headerFormat.size))
+        while True:
+            header = f.read(recordFormat.size)
+            if len(header) < recordFormat.size: # end of the file (or a recording that was cut off)
+                return
+            t, count = recordFormat.unpack(header)
+            tiles = []
+            for i in range(count):
+                tileHeader = f.read(tileFormat.size)
+                if len(tileHeader) < tileFormat.size:
+                    return
+                x, y, w, h, length = tileFormat.unpack(tileHeader)
+                data = f.read(length)
+                if len(data) < length:
+                    return
+                tiles.append((x, y, w, h, zlib.decompress(data)))
+            yield t, tiles
+
+class PngWriter: # writes frames as numbered PNG images in a folder
+    def __init__(self, folder, size, fps):
+        self.folder = folder
+        self.count = 0
+        os.makedirs(folder, exist_ok = True)
+
+    def write(self, frame):
+        image.save(frame, os.path.join(self.folder, 'frame_%05i.png' % self.count))
+        self.count += 1
+
+    def close(self):
+        pass
+
+class Y4mWriter: # writes frames to an uncompressed YUV4MPEG2 video (4:4:4, full range BT.601 colours)
+    def __init__(self, fileName, size, fps):
+        if numpy == None:
+            raise ValueError('Y4M export needs numpy (PNG export does not)')
+        self.size = size
+        self.count = 0
+        self.file = open(fileName, 'wb')
+        self.file.write(('YUV4MPEG2 W%i H%i F%i:1 Ip A1:1 C444 XCOLORRANGE=FULL\n' % (size[0], size[1], fps)).encode())
+
+    def write(self, frame):
+        rgb = numpy.frombuffer(image.tostring(frame, 'RGB'), numpy.uint8).reshape(-1, 3).astype(numpy.float32)
+        r, g, b = rgb[:, 0], rgb[:, 1], rgb[:, 2]
+        y = 0.299*r + 0.587*g + 0.114*b
+        planes = numpy.stack([y, (b-y)*0.564 + 128, (r-y)*0.713 + 128])
+        self.file.write(b'FRAME\n')
+        self.file.write(numpy.clip(planes + 0.5, 0, 255).astype(numpy.uint8).tobytes())
+        self.count += 1
+
+    def close(self):
+        self.file.close()
+
+def export(fileName, output, size = None, speed = 8, fps = 30, gap = 1): # write the frames of a timelapse
+    # speed -- seconds of drawing shown in each second of video
+    # gap -- the longest time the canvas can stay the same, in seconds of drawing (so breaks are skipped)
+    records = read_stream(fileName)
+    canvasW, canvasH = next(records)
+    canvas = Surface((canvasW, canvasH))
+    canvas.fill(WHITE)
+    size = size or (canvasW, canvasH)
+    frame = canvas if size == (canvasW, canvasH) else Surface(size)
+    if output.lower().endswith('.y4m'):
+        writer = Y4mWriter(output, size, fps)
+    else:
+        writer = PngWriter(output, size, fps)
+
+    def write_frame():
+        if frame is not canvas:
+            transform.smoothscale(canvas, size, frame)
+        writer.write(frame)
+
+    step = speed / fps # seconds of drawing between two frames
+    shown, last = 0, 0 # time in the video, and time of the last record (both in seconds of drawing)
+    for t, tiles in records:
+        shown += min(t - last, gap)
+        last = t
+        while writer.count*step < shown: # frames before this record show the canvas as it was
+            write_frame()
+        for x, y, w, h, data in tiles:
+            canvas.blit(image.fromstring(data, (w, h), 'RGB'), (x, y))
+    for i in range(fps): # show the finished canvas for one second
+        write_frame()
+    writer.close()
+    return writer.count
+
+###########################################################################
+
+def bench(frames = 600): # record simulated strokes, and compare the stream with keeping a copy of every frame
+    init()
+    seed(1)
+    canvas = Surface(canvasSize)
+    canvas.fill(WHITE)
+    folder = tempfile.TemporaryDirectory()
+    fileName = os.path.join(folder.name, 'bench.tl')
+    recorder = TimelapseRecorder(fileName)
+    x, y = 375, 275
+    start = time.perf_counter()
+    for i in range(frames): # like drawing with the brush at 60 frames per second, with a new stroke every second
+        if i % 60 == 0:
+            colour = (randint(0, 255), randint(0, 255), randint(0, 255))
+        newx, newy = min(max(x + randint(-15, 15), 0), 749), min(max(y + randint(-15, 15), 0), 549)
+        apply_op({'op': 'brush', 'colour': colour, 'points': [[x, y], [newx, newy]]}, canvas, {})
+        x, y = newx, newy
+        recorder.capture(canvas, force = True)
+    elapsed = time.perf_counter() - start
+    recorder.close(canvas)
+
+    exportStart = time.perf_counter()
+    output = os.path.join(folder.name, 'bench.y4m' if numpy != None else 'frames')
+    count = export(fileName, output, (375, 275), speed = 4, fps = 30)
+    exportTime = time.perf_counter() - exportStart
+    folder.cleanup()
+    print(recorder.report())
+    print('%i frames: %.2f ms per frame with recording, %.1f MB to keep a copy of every frame instead'
+          % (frames, 1000*elapsed/frames, frames*canvasSize[0]*canvasSize[1]*3/1024/1024))
+    print('export: %i frames at 375 x 275 in %.2f s (%.1f ms per frame)' % (count, exportTime, 1000*exportTime/max(count, 1)))
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Export or measure timelapse recordings of the paint program.')
+    commands = parser.add_subparsers(dest = 'command', required = True)
+    exportParser = commands.add_parser('export', help = 'export a recording as PNG images or a Y4M video')
+    exportParser.add_argument('stream', help = 'recording made with paint_project.py --record')
+    exportParser.add_argument('output', help = 'a .y4m file, or a folder for PNG images')
+    exportParser.add_argument('--size', help = 'size of the frames, e.g. 375x275 (default: size of the canvas)')
+    exportParser.add_argument('--speed', type = float, default = 8, help = 'seconds of drawing in each second of video')
+    exportParser.add_argument('--fps', type = int, default = 30, help = 'frames per second of the video')
+    exportParser.add_argument('--gap', type = float, default = 1, help = 'longest break kept, in seconds of drawing')
+    benchParser = commands.add_parser('bench', help = 'measure recording and export with simulated strokes')
+    benchParser.add_argument('--frames', type = int, default = 600)
+    args = parser.parse_args()
+
+    if args.command == 'bench':
+        bench(args.frames)
+        return 0
+    size = tuple(int(i) for i in args.size.split('x')) if args.size else None
+    start = time.perf_counter()
+    count = export(args.stream, args.output, size, args.speed, args.fps, args.gap)
+    print('exported %i frames in %.2f s' % (count, time.perf_counter() - start))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())